@@ -4,14 +4,36 @@ ThinkBoard - Data Analytics Dashboard
 A Flask application for data analysis and visualization
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_from_directory
 from flask_cors import CORS
-import pandas as pd
-import numpy as np
 import os
 import logging
+import threading
+import time
 from werkzeug.utils import secure_filename
 
+from cache import DataFrameCache, ResultCache
+from catalog import MetadataCatalog
+from columnar import ColumnarStore, read_csv_frame
+from compression import COMPRESSIBLE_MIMETYPES, available_encodings, compress, etag_for
+from datasets import DatasetRegistry
+from downsample import DOWNSAMPLE_METHODS, downsample
+from responses import arrays_response, response_format, rows_response, stream_rows, streaming_mode
+from queries import (NUMERIC_AGGREGATIONS, aggregate_frame, contains_positions, decode_cursor, encode_cursor,
+                     parse_aggregations, parse_page, sorted_positions)
+from indexes import SearchIndexCache, SortIndexCache, TrigramIndex
+from jobs import JobQueue, JobQueueFull
+from lazy import lazy_import, preload
+from metrics import MetricsRegistry
+from profiling import PROFILING_MODES, begin_profile, configure_slow_log, end_profile, log_slow_request, stage
+from offload import ProcessOffload, aggregate_task, ingest_task, search_positions_task, sort_positions_task
+from ingest import (HISTOGRAM_RESOLUTIONS, frame_histograms, optimize_dtypes, read_csv_once, sniff_csv,
+                    summarize_csv_streaming, summarize_frame, validate_dataframe)
+
+# pandas and NumPy are imported on first use, not at startup
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,6 +45,76 @@ CORS(app)
 UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'Uploads')
 ALLOWED_EXTENSIONS = {'csv'}
 MAX_FILE_SIZE = int(os.environ.get('MAX_FILE_SIZE', 5 * 1024 * 1024))  # 5MB for Railway
+DATAFRAME_CACHE_SIZE = int(os.environ.get('DATAFRAME_CACHE_SIZE', 256 * 1024 * 1024))  # 256MB of parsed frames
+COLUMNAR_STORE_ENABLED = os.environ.get('COLUMNAR_STORE', '1') == '1'
+OPTIMIZE_DTYPES = os.environ.get('OPTIMIZE_DTYPES', '1') == '1'  # Downcast numbers and categorize repetitive text after parsing
+STREAMING_INGEST_THRESHOLD = int(os.environ.get('STREAMING_INGEST_THRESHOLD', 50 * 1024 * 1024))  # Stream files above 50MB, needs MAX_FILE_SIZE raised past it
+INGEST_CHUNK_ROWS = int(os.environ.get('INGEST_CHUNK_ROWS', 100_000))
+SORT_INDEX_SIZE = int(os.environ.get('SORT_INDEX_SIZE', 128 * 1024 * 1024))  # 128MB of sort permutations
+SORT_INDEX_BUILD_AFTER = int(os.environ.get('SORT_INDEX_BUILD_AFTER', 2))  # Index a sort once it is repeated
+SEARCH_INDEX_SIZE = int(os.environ.get('SEARCH_INDEX_SIZE', 256 * 1024 * 1024))  # 256MB of trigram indexes, 0 disables
+SEARCH_INDEX_MIN_ROWS = int(os.environ.get('SEARCH_INDEX_MIN_ROWS', 50_000))  # Smaller columns are scanned
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 64 * 1024 * 1024))  # 64MB of serialized responses, 0 disables
+RESULT_CACHE_TTL = int(os.environ.get('RESULT_CACHE_TTL', 300))  # Seconds a cached response stays valid
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))  # Threads processing asynchronous uploads
+JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', 16))  # Uploads waiting for a worker before new ones are refused
+PROCESS_POOL_SIZE = int(os.environ.get('PROCESS_POOL_SIZE', 0))  # Worker processes for CPU-bound work, 0 runs it in-thread
+PROCESS_OFFLOAD_MIN_ROWS = int(os.environ.get('PROCESS_OFFLOAD_MIN_ROWS', 100_000))  # Smaller datasets are sorted and scanned in-thread
+PROCESS_OFFLOAD_MIN_BYTES = int(os.environ.get('PROCESS_OFFLOAD_MIN_BYTES', 1024 * 1024))  # Smaller uploads are parsed in-thread
+PRELOAD_IMPORTS = os.environ.get('PRELOAD_IMPORTS', '1') == '1'  # Import pandas/NumPy in the background once the server is up
+COMPRESSION_ENABLED = os.environ.get('COMPRESSION', '1') == '1'
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))  # Smaller responses are sent as they are
+COMPRESS_MAX_BYTES = int(os.environ.get('COMPRESS_MAX_BYTES', 64 * 1024 * 1024))  # Larger ones too, compressing them would stall the request
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))  # gzip 1-9, br 0-11
+SUMMARY_APPROX_ROWS = int(os.environ.get('SUMMARY_APPROX_ROWS', 5_000_000))  # Sample median/mode above this many rows
+PROFILING = os.environ.get('PROFILING', 'off').lower()  # off, stages (Server-Timing header) or cprofile (adds a function profile)
+PROFILE_TOP_N = int(os.environ.get('PROFILE_TOP_N', 25))  # Functions kept from each cProfile run
+SLOW_REQUEST_SECONDS = float(os.environ.get('SLOW_REQUEST_SECONDS', 0))  # Log requests slower than this, 0 disables
+SLOW_REQUEST_LOG = os.environ.get('SLOW_REQUEST_LOG', '')  # JSON-lines file for slow requests, default is the app log
+
+# Parsed CSVs shared by all requests in this process
+dataframe_cache = DataFrameCache(DATAFRAME_CACHE_SIZE)
+
+# Memory-mapped binary copies of uploaded CSVs
+columnar_store = ColumnarStore() if COLUMNAR_STORE_ENABLED else None
+
+# Uploaded datasets addressed by the dataset_id returned from /upload
+dataset_registry = DatasetRegistry()
+
+# Per-column sort permutations so repeat sorts are answered by slicing
+sort_indexes = SortIndexCache(SORT_INDEX_SIZE, store=columnar_store, build_after=SORT_INDEX_BUILD_AFTER)
+
+# Trigram indexes that narrow substring searches on large text columns
+search_indexes = SearchIndexCache(SEARCH_INDEX_SIZE, min_rows=SEARCH_INDEX_MIN_ROWS) if SEARCH_INDEX_SIZE > 0 else None
+
+# Serialized /sort, /search, /gradient and /aggregate responses keyed by dataset version and parameters
+result_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL) if RESULT_CACHE_SIZE > 0 else None
+
+# Workers that parse and summarize uploads sent with async=1
+job_queue = JobQueue(workers=JOB_WORKERS, max_pending=JOB_QUEUE_SIZE)
+
+# Worker processes that sort, scan and parse outside this process's GIL
+process_pool = ProcessOffload(PROCESS_POOL_SIZE, DATAFRAME_CACHE_SIZE // max(PROCESS_POOL_SIZE, 1),
+                              use_columnar=COLUMNAR_STORE_ENABLED,
+                              optimize_dtypes=OPTIMIZE_DTYPES) if PROCESS_POOL_SIZE > 0 else None
+
+# Prometheus metrics served on /metrics
+metrics = MetricsRegistry()
+request_duration = metrics.histogram('request_duration_seconds', 'Request latency by route', ['route', 'method'])
+requests_total = metrics.counter('requests_total', 'Requests by route, method and status code', ['route', 'method', 'status'])
+request_errors = metrics.counter('request_errors_total', 'Requests answered with a 5xx status', ['route'])
+requests_in_flight = metrics.gauge('requests_in_flight', 'Requests currently being handled')
+request_bytes = metrics.counter('request_bytes_total', 'Request body bytes received', ['route'])
+response_bytes = metrics.counter('response_bytes_total', 'Response body bytes sent (streamed bodies excluded)', ['route'])
+csv_parse_duration = metrics.histogram('csv_parse_seconds', 'Time spent parsing CSV files', ['source'])
+csv_rows_parsed = metrics.counter('csv_rows_parsed_total', 'Rows parsed from CSV files', ['source'])
+
+# Per-request stage timings, only collected when profiling or the slow-request log is on
+if PROFILING not in PROFILING_MODES:
+    logger.warning(f"Unknown PROFILING mode '{PROFILING}', profiling disabled")
+    PROFILING = 'off'
+PROFILE_REQUESTS = PROFILING != 'off' or SLOW_REQUEST_SECONDS > 0
+configure_slow_log(SLOW_REQUEST_LOG or None)
 
 # Ensure upload folder exists with proper permissions
 def setup_upload_folder():
@@ -30,6 +122,7 @@ def setup_upload_folder():
     try:
         # Try multiple locations for Railway compatibility
         possible_folders = [
+            UPLOAD_FOLDER,
             'Uploads',
             '/tmp',
             '/tmp/uploads',
@@ -60,24 +153,515 @@ def setup_upload_folder():
         logger.error(f"Error setting up upload folder: {e}")
         UPLOAD_FOLDER = '.'
 
-# Setup upload folder
-setup_upload_folder()
+# The upload folder is probed and the catalog opened on first use, not at import
+startup_lock = threading.RLock()
+upload_folder_ready = False
+
+# Schema and row count of every upload, so /stats does not re-parse files
+CATALOG_PATH = os.environ.get('CATALOG_PATH')
+metadata_catalog = None
+
+def upload_folder():
+    """The upload folder, set up the first time it is needed"""
+    global upload_folder_ready
+    if not upload_folder_ready:
+        with startup_lock:
+            if not upload_folder_ready:
+                setup_upload_folder()
+                upload_folder_ready = True
+    return UPLOAD_FOLDER
+
+def get_metadata_catalog():
+    """The metadata catalog, opened the first time it is needed"""
+    global metadata_catalog
+    if metadata_catalog is None:
+        with startup_lock:
+            if metadata_catalog is None:
+                metadata_catalog = MetadataCatalog(CATALOG_PATH or os.path.join(upload_folder(), '.catalog.sqlite3'))
+    return metadata_catalog
+
+def warm_up():
+    """Do the deferred startup work ahead of the first request that needs it"""
+    try:
+        upload_folder()
+        get_metadata_catalog()
+        preload('numpy', 'pandas')
+        logger.info("Warm-up finished: upload folder ready, pandas and NumPy imported")
+    except Exception as e:
+        logger.warning(f"Warm-up failed, the first request will finish it: {e}")
+
+def create_app(preload_imports=None):
+    """Return the application, ready to serve.
+    
+    Importing this module only registers routes and reads configuration;
+    probing the upload folder, opening the catalog and importing pandas
+    and NumPy happen on first use. With preload_imports (PRELOAD_IMPORTS
+    by default) that work starts on a background thread, so the server
+    can accept health checks while it finishes.
+    """
+    if preload_imports is None:
+        preload_imports = PRELOAD_IMPORTS
+    if preload_imports:
+        threading.Thread(target=warm_up, name="thinkboard-warm-up", daemon=True).start()
+    return app
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def validate_csv(file_path):
-    """Validate CSV file content"""
+def record_parse(source, started, rows):
+    """Record the duration and row count of one CSV parse"""
+    csv_parse_duration.observe(time.perf_counter() - started, source=source)
+    csv_rows_parsed.inc(rows or 0, source=source)
+
+def prepare_frame(df):
+    """Narrow the dtypes of a re-parsed frame the way uploads are"""
+    return optimize_dtypes(df)[0]
+
+def load_dataframe(file_path):
+    """Load a CSV file through the parsed DataFrame cache"""
+    # Re-parse with the encoding and dialect sniffed at upload time
+    dataset = dataset_registry.get_by_path(file_path)
+    csv_options = dataset.csv_options if dataset else {}
+    
+    def loader(path):
+        started = time.perf_counter()
+        with stage('parse'):
+            df = read_csv_frame(path, columnar_store, prepare_frame if OPTIMIZE_DTYPES else None, **csv_options)
+        record_parse('reload', started, len(df))
+        return df
+    
+    return dataframe_cache.get(file_path, loader=loader)
+
+def load_numeric_column(file_path, column):
+    """Load one numeric column without parsing the rest of the file.
+    
+    Returns None when the column is not available memory-mapped, in which
+    case callers fall back to the full DataFrame.
+    """
+    if columnar_store is None:
+        return None
     try:
-        df = pd.read_csv(file_path)
-        if df.empty:
-            return False, "CSV file is empty"
-        if len(df.columns) == 0:
-            return False, "CSV file has no columns"
-        return True, "Valid CSV file"
+        with stage('load'):
+            values = columnar_store.load_column(file_path, column)
     except Exception as e:
-        return False, f"Invalid CSV file: {str(e)}"
+        logger.warning(f"Could not map column '{column}' of {file_path}: {e}")
+        return None
+    if values is None or not np.issubdtype(values.dtype, np.number):
+        return None
+    return values
+
+def resolve_dataset(data):
+    """Resolve the dataset a request refers to.
+    
+    Uses the dataset_id from the request when given, otherwise the most
+    recently uploaded dataset. Returns (dataset, None) on success or
+    (None, error_response) when nothing matches.
+    """
+    dataset_id = data.get('dataset_id')
+    if dataset_id:
+        dataset = dataset_registry.get(dataset_id)
+        if dataset is None:
+            return None, (jsonify({"error": f"Dataset '{dataset_id}' not found"}), 404)
+        return dataset, None
+    
+    dataset = dataset_registry.latest()
+    if dataset is None:
+        # Nothing uploaded since startup, fall back to the newest file on disk once
+        folder = upload_folder()
+        files = [f for f in os.listdir(folder) if f.endswith('.csv')]
+        if not files:
+            return None, (jsonify({"error": "No CSV files found"}), 404)
+        latest_file = max(files, key=lambda x: os.path.getctime(os.path.join(folder, x)))
+        dataset = register_from_disk(os.path.join(folder, latest_file))
+    return dataset, None
+
+def register_from_disk(path):
+    """Register a file uploaded before this process started.
+    
+    The schema and the encoding and dialect sniffed at upload come from
+    the metadata catalog; without a current record the file is sniffed
+    again, so it is never re-parsed with pandas' defaults.
+    """
+    try:
+        entry = get_metadata_catalog().get(path)
+    except Exception as e:
+        logger.warning(f"Could not read the catalog record of {path}: {e}")
+        entry = None
+    if entry is None:
+        return dataset_registry.register(path, csv_options=sniff_csv(path))
+    schema = {key: entry[key] for key in ("columns", "dtypes", "numeric_columns", "row_count")}
+    return dataset_registry.register(path, schema=schema, csv_options=entry["csv_options"])
+
+def ingest_streaming(file_path, filename, job=None):
+    """Summarize an uploaded CSV chunk by chunk in bounded memory"""
+    file_size = max(os.path.getsize(file_path), 1)
+    
+    def on_chunk(rows, offset):
+        # Parsing is most of the work, the remaining stages share the last fifth
+        job.report('parsing', 0.8 * min(offset / file_size, 1.0), rows_processed=rows, bytes_processed=offset)
+    
+    started = time.perf_counter()
+    try:
+        with stage('parse'):
+            streamed = summarize_csv_streaming(file_path, chunk_rows=INGEST_CHUNK_ROWS, on_chunk=on_chunk if job else None)
+    except Exception as csv_error:
+        logger.error(f"Error reading CSV: {csv_error}")
+        return {"error": f"Could not read CSV file: {str(csv_error)}"}, 400
+    record_parse('streaming', started, streamed.row_count)
+    
+    if streamed.row_count == 0:
+        logger.warning("CSV validation failed: CSV file is empty")
+    logger.info(f"File uploaded successfully: {filename} with {streamed.row_count} rows and {len(streamed.columns or [])} columns (streamed)")
+    
+    # The whole frame was never materialized, drop anything derived from an older upload
+    if job:
+        job.report('indexing', 0.85, rows_processed=streamed.row_count)
+    dataframe_cache.invalidate(file_path)
+    if columnar_store is not None:
+        columnar_store.remove(file_path)
+    dataset = dataset_registry.register(file_path, schema=streamed.schema(), csv_options=streamed.csv_options,
+                                        histograms=streamed.histograms(HISTOGRAM_RESOLUTIONS))
+    invalidate_derived(dataset)
+    record_metadata(dataset)
+    
+    if job:
+        job.report('summarizing', 0.95)
+    return {
+        "message": "File uploaded successfully",
+        "filename": filename,
+        "dataset_id": dataset.dataset_id,
+        "version": dataset.version,
+        "ingest_mode": "streaming",
+        "summary": streamed.summary()
+    }, 200
+
+def ingest_offloaded(file_path, filename, job=None):
+    """Parse, write the columnar copy and summarize an upload in the process pool"""
+    if job:
+        job.report('parsing', 0.1)
+    started = time.perf_counter()
+    try:
+        with stage('worker'):
+            schema, csv_options, summary, message, memory = process_pool.run(ingest_task, os.path.abspath(file_path), SUMMARY_APPROX_ROWS)
+    except Exception as csv_error:
+        logger.error(f"Error reading CSV: {csv_error}")
+        return {"error": f"Could not read CSV file: {str(csv_error)}"}, 400
+    record_parse('worker', started, schema['row_count'])
+    
+    if message:
+        logger.warning(f"CSV validation failed: {message}")
+    logger.info(f"File uploaded successfully: {filename} with {schema['row_count']} rows and {len(schema['columns'])} columns (worker process)")
+    
+    dataframe_cache.invalidate(file_path)
+    dataset = dataset_registry.register(file_path, schema=schema, csv_options=csv_options, memory=memory,
+                                        histograms=summary.pop("histograms", None))
+    invalidate_derived(dataset)
+    record_metadata(dataset)
+    
+    return {
+        "message": "File uploaded successfully",
+        "filename": filename,
+        "dataset_id": dataset.dataset_id,
+        "version": dataset.version,
+        "memory": memory,
+        "summary": summary
+    }, 200
+
+def ingest_upload(file_path, filename, file_size, job=None):
+    """Parse, register and summarize a saved upload.
+    
+    Returns (payload, status_code) so the same work can answer the
+    request directly or run as a background job reporting its progress.
+    """
+    # Large files are summarized in chunks instead of being loaded whole
+    if file_size > STREAMING_INGEST_THRESHOLD:
+        return ingest_streaming(file_path, filename, job)
+    
+    # Mid-sized files are parsed in a worker process, the frame is read back memory-mapped
+    if process_pool is not None and file_size >= PROCESS_OFFLOAD_MIN_BYTES:
+        return ingest_offloaded(file_path, filename, job)
+    
+    # Sniff encoding, delimiter and header up front, then parse exactly once
+    if job:
+        job.report('parsing', 0.1)
+    started = time.perf_counter()
+    try:
+        with stage('parse'):
+            df, csv_options = read_csv_once(file_path)
+        record_parse('upload', started, len(df))
+        logger.info(f"File uploaded successfully: {filename} with {len(df)} rows and {len(df.columns)} columns")
+    except Exception as csv_error:
+        logger.error(f"Error reading CSV: {csv_error}")
+        return {"error": f"Could not read CSV file: {str(csv_error)}"}, 400
+    
+    # Validate the parsed frame; problems are logged but not fatal
+    with stage('validate'):
+        is_valid, message = validate_dataframe(df)
+    if not is_valid:
+        logger.warning(f"CSV validation failed: {message}")
+    
+    # Narrow dtypes before anything is cached or written, so every copy is the small one
+    memory = None
+    if OPTIMIZE_DTYPES:
+        with stage('optimize'):
+            df, memory = optimize_dtypes(df)
+        logger.info(f"Optimized dtypes of {filename}: {memory['bytes_before']} -> {memory['bytes_after']} bytes")
+    
+    if job:
+        job.report('indexing', 0.5, rows_processed=len(df))
+    with stage('register'):
+        dataset = dataset_registry.register(file_path, df, csv_options=csv_options, memory=memory)
+        invalidate_derived(dataset)
+        record_metadata(dataset)
+    
+    # Keep a columnar copy so later requests, in this or any other worker
+    # process, map the numeric columns instead of holding a private copy
+    if columnar_store is not None:
+        try:
+            parsed = df
+            with stage('columnar'):
+                df = columnar_store.materialize(file_path, lambda: parsed)
+        except Exception as columnar_error:
+            logger.warning(f"Could not write columnar copy: {columnar_error}")
+    
+    # Replace any stale cached copy so the next /sort or /search skips parsing
+    dataframe_cache.put(file_path, df)
+    
+    # Calculate statistics for all numeric columns in one vectorized pass
+    if job:
+        job.report('summarizing', 0.8)
+    # Histograms come from the same block, so /histogram never touches the rows again
+    with stage('summary'):
+        summary = summarize_frame(df, approximate=len(df) > SUMMARY_APPROX_ROWS, histogram_resolutions=HISTOGRAM_RESOLUTIONS)
+        dataset.histograms = summary.pop("histograms")
+    
+    return {
+        "message": "File uploaded successfully",
+        "filename": filename,
+        "dataset_id": dataset.dataset_id,
+        "version": dataset.version,
+        "memory": memory,
+        "summary": summary
+    }, 200
+
+def invalidate_derived(dataset):
+    """Drop indexes and cached results built from older versions of a dataset"""
+    sort_indexes.invalidate(dataset.path)
+    if search_indexes is not None:
+        search_indexes.invalidate(dataset.path)
+    if result_cache is not None:
+        result_cache.invalidate(dataset.path)
+
+def result_etag(key):
+    """Weak ETag for a result key.
+    
+    Built from the file's mtime and size rather than the in-process dataset
+    version, so every worker and restart hands out the same validator until
+    the file is uploaded again.
+    """
+    path, _, endpoint, params = key
+    st = os.stat(path)
+    return etag_for(path, st.st_mtime_ns, st.st_size, endpoint, params)
+
+def cached_result(key):
+    """Return a 304 or the cached response for a result key, or None"""
+    etag = result_etag(key)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+    entry = result_cache.get(key) if result_cache is not None else None
+    if entry is None:
+        return None
+    response = Response(entry.body, mimetype=entry.mimetype, headers=entry.headers)
+    response.set_etag(etag, weak=True)
+    response.vary.add('Accept')
+    response.headers['X-Cache'] = 'HIT'
+    # Lets compress_response reuse or keep the compressed body
+    g.result_entry = (key, entry)
+    return response
+
+def cache_result(key, response):
+    """Tag a successful response and keep its serialized body for repeat requests"""
+    if response.status_code == 200:
+        response.set_etag(result_etag(key), weak=True)
+        # The body format can be negotiated through Accept
+        response.vary.add('Accept')
+        if result_cache is not None:
+            g.result_entry = (key, result_cache.put(key, response.get_data(), response.mimetype))
+            response.headers['X-Cache'] = 'MISS'
+    return response
+
+def offloaded(dataset):
+    """Whether queries on a dataset are big enough to run in the process pool"""
+    return process_pool is not None and (dataset.row_count or 0) >= PROCESS_OFFLOAD_MIN_ROWS
+
+def sort_positions(dataset, df, column, ascending, k=None):
+    """sorted_positions for a dataset column, in a worker process for large datasets"""
+    with stage('sort'):
+        if offloaded(dataset):
+            return process_pool.run(sort_positions_task, dataset.path, dataset.csv_options, column, ascending, k)
+        return sorted_positions(df[column], ascending, k)
+
+def scan_positions(dataset, df, column, query):
+    """Positions of rows whose column contains query, ignoring case"""
+    with stage('search'):
+        if offloaded(dataset):
+            return process_pool.run(search_positions_task, dataset.path, dataset.csv_options, column, query)
+        return contains_positions(df[column], query)
+
+def aggregate_groups(dataset, df, group_by, aggregations):
+    """aggregate_frame for a dataset, in a worker process for large datasets"""
+    with stage('aggregate'):
+        if offloaded(dataset):
+            return process_pool.run(aggregate_task, dataset.path, dataset.csv_options, group_by, aggregations)
+        return aggregate_frame(df, group_by, aggregations)
+
+def dataset_histograms(dataset):
+    """The histograms stored with a dataset, built from its frame if it has none yet"""
+    histograms = dataset.histograms
+    if histograms is None:
+        df = load_dataframe(dataset.path)
+        with stage('histogram'):
+            histograms = frame_histograms(df, HISTOGRAM_RESOLUTIONS)
+        dataset.histograms = histograms
+    return histograms
+
+def record_metadata(dataset):
+    """Write the dataset's schema to the catalog; failures are not fatal"""
+    try:
+        get_metadata_catalog().record_dataset(dataset)
+    except Exception as e:
+        logger.warning(f"Could not record {dataset.filename} in the catalog: {e}")
+
+def profile_csv(file_path):
+    """Schema and CSV options of a file the catalog has not seen in its current form"""
+    started = time.perf_counter()
+    if os.path.getsize(file_path) > STREAMING_INGEST_THRESHOLD:
+        streamed = summarize_csv_streaming(file_path, chunk_rows=INGEST_CHUNK_ROWS)
+        record_parse('catalog', started, streamed.row_count)
+        return streamed.schema(), streamed.csv_options
+    df, csv_options = read_csv_once(file_path)
+    record_parse('catalog', started, len(df))
+    return {
+        "columns": df.columns.tolist(),
+        "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
+        "numeric_columns": df.select_dtypes(include=[np.number]).columns.tolist(),
+        "row_count": len(df)
+    }, csv_options
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.in_flight = True
+    requests_in_flight.inc()
+    if PROFILE_REQUESTS:
+        begin_profile(cprofile=PROFILING == 'cprofile')
+
+@app.after_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    started = g.pop('request_started', None)
+    if started is not None:
+        request_duration.observe(time.perf_counter() - started, route=route, method=request.method)
+    requests_total.inc(route=route, method=request.method, status=response.status_code)
+    if response.status_code >= 500:
+        request_errors.inc(route=route)
+    request_bytes.inc(request.content_length or 0, route=route)
+    if not response.is_streamed:
+        response_bytes.inc(response.content_length or 0, route=route)
+    profile = end_profile()
+    if profile is not None:
+        report_profile(profile, response)
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Gzip (or Brotli, when installed) text responses the client accepts.
+    
+    Registered after the metrics hook so it runs first and the metrics
+    see the bytes actually sent. Files from send_from_directory are read
+    into memory to be compressed, up to COMPRESS_MAX_BYTES.
+    """
+    if not COMPRESSION_ENABLED or response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or (response.is_streamed and not response.direct_passthrough):
+        return response
+    size = response.content_length
+    if size is None or size < COMPRESS_MIN_BYTES or size > COMPRESS_MAX_BYTES:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return response
+    
+    cached = g.pop('result_entry', None)
+    data = cached[1].encoded.get(encoding) if cached else None
+    if data is None:
+        with stage('compress'):
+            response.direct_passthrough = False
+            data = compress(response.get_data(), encoding, COMPRESS_LEVEL)
+        if cached and result_cache is not None:
+            result_cache.add_encoding(*cached, encoding, data)
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    # The encoded bytes differ, so a strong validator from send_file becomes weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def report_profile(profile, response):
+    """Attach stage timings to the response and log the request if it was slow"""
+    if PROFILING != 'off':
+        response.headers['Server-Timing'] = profile.server_timing()
+    if PROFILING == 'cprofile':
+        top = profile.top(PROFILE_TOP_N)
+        if top:
+            logger.info(f"Profile for {request.method} {request.path}:\n{top}")
+    if SLOW_REQUEST_SECONDS > 0 and profile.duration > SLOW_REQUEST_SECONDS:
+        log_slow_request(profile, request.method, request.full_path.rstrip('?'), response.status_code, PROFILE_TOP_N)
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    # Streamed responses tear the request down again when the body is done
+    if g.pop('in_flight', False):
+        requests_in_flight.dec()
+        # Requests that failed before after_request still stop profiling here
+        end_profile()
+
+@metrics.collector
+def collect_cache_metrics():
+    """Hit ratios and sizes of the caches and queues, read at scrape time"""
+    caches = {"dataframe": dataframe_cache.stats(), "sort_index": sort_indexes.stats()}
+    if result_cache is not None:
+        caches["result"] = result_cache.stats()
+    if search_indexes is not None:
+        caches["search_index"] = search_indexes.stats()
+    hits = [({"cache": name}, stats.get("hits")) for name, stats in caches.items()]
+    misses = [({"cache": name}, stats.get("misses")) for name, stats in caches.items()]
+    ratios = []
+    for name, stats in caches.items():
+        lookups = stats.get("hits", 0) + stats.get("misses", 0)
+        if "misses" in stats:
+            ratios.append(({"cache": name}, round(stats["hits"] / lookups, 4) if lookups else 0.0))
+    jobs = job_queue.stats()
+    return [
+        ("cache_hits_total", "counter", "Cache hits", hits),
+        ("cache_misses_total", "counter", "Cache misses", misses),
+        ("cache_hit_ratio", "gauge", "Cache hits over lookups since start", ratios),
+        ("cache_bytes", "gauge", "Bytes held by each cache", [({"cache": name}, stats.get("bytes")) for name, stats in caches.items()]),
+        ("cache_entries", "gauge", "Entries held by each cache", [({"cache": name}, stats.get("entries")) for name, stats in caches.items()]),
+        ("jobs_pending", "gauge", "Background jobs waiting for a worker", [({}, jobs["pending"])]),
+        ("jobs_running", "gauge", "Background jobs being processed", [({}, jobs["running"])]),
+        ("datasets", "gauge", "Datasets registered in this process", [({}, len(dataset_registry))])
+    ]
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Metrics in the Prometheus text exposition format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def index():
@@ -94,7 +678,8 @@ def test_upload():
     """Test upload functionality"""
     try:
         # Test if we can write to upload folder
-        test_file = os.path.join(UPLOAD_FOLDER, 'test.txt')
+        folder = upload_folder()
+        test_file = os.path.join(folder, 'test.txt')
         with open(test_file, 'w') as f:
             f.write('test')
         os.remove(test_file)
@@ -102,8 +687,8 @@ def test_upload():
         return jsonify({
             "status": "success",
             "message": "Upload folder is writable",
-            "upload_folder": UPLOAD_FOLDER,
-            "permissions": oct(os.stat(UPLOAD_FOLDER).st_mode)[-3:]
+            "upload_folder": folder,
+            "permissions": oct(os.stat(folder).st_mode)[-3:]
         })
     except Exception as e:
         return jsonify({
@@ -127,7 +712,7 @@ def simple_upload():
         
         # Save file without validation
         filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
+        file_path = os.path.join(upload_folder(), filename)
         
         try:
             os.makedirs(os.path.dirname(file_path), exist_ok=True)
@@ -164,7 +749,7 @@ def upload_any_file():
         
         # Save file without any restrictions
         filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
+        file_path = os.path.join(upload_folder(), filename)
         
         try:
             # Try multiple locations
@@ -210,11 +795,12 @@ def upload_any_file():
 def health_check():
     """Health check endpoint"""
     # Check upload folder status
+    folder = upload_folder()
     upload_status = "OK"
     try:
-        if not os.path.exists(UPLOAD_FOLDER):
+        if not os.path.exists(folder):
             upload_status = "NOT_EXISTS"
-        elif not os.access(UPLOAD_FOLDER, os.W_OK):
+        elif not os.access(folder, os.W_OK):
             upload_status = "NOT_WRITABLE"
     except Exception as e:
         upload_status = f"ERROR: {str(e)}"
@@ -223,14 +809,25 @@ def health_check():
         "status": "healthy",
         "message": "ThinkBoard is running",
         "version": "1.0.0",
-        "upload_folder": UPLOAD_FOLDER,
+        "upload_folder": folder,
         "upload_status": upload_status,
-        "max_file_size_mb": MAX_FILE_SIZE // (1024*1024)
+        "max_file_size_mb": MAX_FILE_SIZE // (1024*1024),
+        "dataframe_cache": dataframe_cache.stats(),
+        "sort_indexes": sort_indexes.stats(),
+        "search_indexes": search_indexes.stats() if search_indexes is not None else None,
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "metadata_catalog": get_metadata_catalog().stats(),
+        "jobs": job_queue.stats(),
+        "process_pool": process_pool.stats() if process_pool is not None else None
     })
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
-    """Upload and process CSV file"""
+    """Upload and process CSV file.
+    
+    With async=1 (form field or query string) the file is saved and the
+    response is a 202 with a job ID; poll /jobs/<job_id> for the result.
+    """
     try:
         logger.info("Upload request received")
         
@@ -262,7 +859,7 @@ def upload_file():
         
         # Secure filename and save
         filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
+        file_path = os.path.join(upload_folder(), filename)
         
         logger.info(f"Saving file to: {file_path}")
         
@@ -275,7 +872,8 @@ def upload_file():
             os.makedirs(os.path.dirname(file_path), exist_ok=True)
             
             # Save file
-            file.save(file_path)
+            with stage('save'):
+                file.save(file_path)
             logger.info(f"File saved successfully: {file_path}")
             
             # Verify file was saved
@@ -295,66 +893,25 @@ def upload_file():
                 logger.error(f"Alternative save also failed: {alt_error}")
                 return jsonify({"error": f"Error saving file: {str(save_error)}"}), 500
         
-        # Validate CSV content (with fallback for Railway)
-        try:
-            is_valid, message = validate_csv(file_path)
-            if not is_valid:
-                logger.warning(f"CSV validation failed: {message}")
-                # Don't remove file, just log the warning
-                # Continue with processing
-        except Exception as validation_error:
-            logger.warning(f"CSV validation error: {validation_error}")
-            # Continue with processing even if validation fails
-        
-        # Process the data with robust CSV reading
-        try:
-            df = pd.read_csv(file_path)
-            logger.info(f"File uploaded successfully: {filename} with {len(df)} rows and {len(df.columns)} columns")
-        except Exception as csv_error:
-            logger.error(f"Error reading CSV: {csv_error}")
-            # Try alternative CSV reading methods
+        # With async=1 the request returns at once and a worker does the parsing
+        if request.values.get('async', '').lower() in ('1', 'true', 'yes'):
             try:
-                df = pd.read_csv(file_path, encoding='utf-8')
-            except:
-                try:
-                    df = pd.read_csv(file_path, encoding='latin-1')
-                except:
-                    return jsonify({"error": f"Could not read CSV file: {str(csv_error)}"}), 400
-        
-        # Calculate statistics
-        summary = {
-            "columns": df.columns.tolist(),
-            "row_count": len(df),
-            "mean_values": {},
-            "median_values": {},
-            "mode_values": {},
-            "max_values": {},
-            "min_values": {},
-            "numeric_columns": []
-        }
-        
-        # Process numeric columns
-        numeric_columns = df.select_dtypes(include=[np.number]).columns
-        summary["numeric_columns"] = numeric_columns.tolist()
-        
-        for col in numeric_columns:
-            summary["mean_values"][col] = float(df[col].mean())
-            summary["median_values"][col] = float(df[col].median())
-            summary["max_values"][col] = float(df[col].max())
-            summary["min_values"][col] = float(df[col].min())
-            
-            # Handle mode (can be multiple values)
-            mode_result = df[col].mode()
-            if not mode_result.empty:
-                summary["mode_values"][col] = float(mode_result.iloc[0])
-            else:
-                summary["mode_values"][col] = None
+                job = job_queue.submit('upload', lambda job: ingest_upload(file_path, filename, file_size, job))
+            except JobQueueFull as e:
+                logger.warning(f"Rejected upload {filename}: {e}")
+                return jsonify({"error": "Server is busy processing uploads, please retry shortly"}), 503, {"Retry-After": "5"}
+            logger.info(f"Queued upload {filename} as job {job.job_id}")
+            status_url = f"/jobs/{job.job_id}"
+            return jsonify({
+                "message": "File accepted for processing",
+                "filename": filename,
+                "job_id": job.job_id,
+                "status_url": status_url
+            }), 202, {"Location": status_url}
         
-        return jsonify({
-            "message": "File uploaded successfully",
-            "filename": filename,
-            "summary": summary
-        })
+        payload, status = ingest_upload(file_path, filename, file_size)
+        with stage('serialize'):
+            return jsonify(payload), status
         
     except Exception as e:
         logger.error(f"Error uploading file: {str(e)}")
@@ -362,39 +919,121 @@ def upload_file():
 
 @app.route('/sort', methods=['POST'])
 def sort_data():
-    """Sort data by specified column"""
+    """Sort data by specified column.
+    
+    With limit (and optionally offset or a cursor from a previous page)
+    only that page is returned, found by partial selection instead of a
+    full sort.
+    """
     try:
         data = request.get_json()
         if not data:
             return jsonify({"error": "No JSON data provided"}), 400
         
+        # A cursor carries the column, order and position of the next page
+        cursor = data.get('cursor')
+        if cursor:
+            try:
+                state = decode_cursor(cursor)
+                data = dict(data, dataset_id=state["dataset_id"], column=state["column"],
+                            order=state["order"], limit=state["limit"], offset=state["offset"])
+            except (KeyError, TypeError, ValueError):
+                return jsonify({"error": "Invalid cursor"}), 400
+        
         column = data.get('column')
         order = data.get('order', 'asc')
         
         if not column:
             return jsonify({"error": "Column name is required"}), 400
         
-        # Get the latest uploaded file
-        files = [f for f in os.listdir(UPLOAD_FOLDER) if f.endswith('.csv')]
-        if not files:
-            return jsonify({"error": "No CSV files found"}), 404
+        try:
+            limit, offset = parse_page(data)
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"Invalid pagination parameters: {str(e)}"}), 400
         
-        latest_file = max(files, key=lambda x: os.path.getctime(os.path.join(UPLOAD_FOLDER, x)))
-        file_path = os.path.join(UPLOAD_FOLDER, latest_file)
+        dataset, error = resolve_dataset(data)
+        if error:
+            return error
+        if cursor and state["version"] != dataset.version:
+            return jsonify({"error": "Cursor is stale, the dataset was re-uploaded"}), 409
         
-        df = pd.read_csv(file_path)
+        # Identical requests against the same dataset version are served from cache
+        ascending = order.lower() == 'asc'
+        stream = streaming_mode(request, data)
+        try:
+            fmt = response_format(request, data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        cache_key = ResultCache.make_key('sort', dataset, column=column, ascending=ascending, limit=limit, offset=offset, format=fmt)
+        if not stream:
+            cached = cached_result(cache_key)
+            if cached is not None:
+                return cached
+        
+        df = load_dataframe(dataset.path)
         
         if column not in df.columns:
             available_columns = df.columns.tolist()
             return jsonify({"error": f"Column '{column}' not found. Available columns: {available_columns}"}), 400
         
         # Sort the data
-        ascending = order.lower() == 'asc'
-        sorted_df = df.sort_values(by=column, ascending=ascending)
+        permutation = sort_indexes.lookup(dataset, column, ascending)
         
-        logger.info(f"Data sorted by {column} in {order} order")
-        
-        return jsonify(sorted_df.to_dict('records'))
+        if limit is None:
+            if permutation is not None:
+                positions = permutation
+            else:
+                try:
+                    # A full sort costs the same as building the index, so keep it
+                    positions = sort_indexes.build(dataset, column, ascending, sort_positions(dataset, df, column, ascending))
+                except TypeError:
+                    # Mixed-type columns cannot be ranked, let pandas handle them
+                    order_index = df[column].sort_values(ascending=ascending, kind='stable').index
+                    positions = df.index.get_indexer(order_index)
+            logger.info(f"Data sorted by {column} in {order} order")
+            if stream:
+                # Rows are serialized batch by batch as the client reads them
+                return stream_rows(df, positions, stream, headers={'X-Total-Count': str(len(df))})
+            with stage('serialize'):
+                return cache_result(cache_key, rows_response(df.iloc[positions], fmt))
+        
+        # Repeated sorts are indexed, so later pages are plain slices
+        if permutation is None and sort_indexes.should_build(dataset, column, ascending):
+            try:
+                permutation = sort_indexes.build(dataset, column, ascending, sort_positions(dataset, df, column, ascending))
+            except TypeError:
+                pass
+        
+        if permutation is not None:
+            positions = permutation[offset:offset + limit]
+        else:
+            # Only the rows up to the end of the requested page are ordered
+            try:
+                positions = sort_positions(dataset, df, column, ascending, k=offset + limit)[offset:]
+            except TypeError:
+                order_index = df[column].sort_values(ascending=ascending, kind='stable').index
+                positions = df.index.get_indexer(order_index[offset:offset + limit])
+        next_offset = offset + limit
+        next_cursor = None
+        if next_offset < len(df):
+            next_cursor = encode_cursor(dataset_id=dataset.dataset_id, version=dataset.version,
+                                        column=column, order=order, limit=limit, offset=next_offset)
+        
+        logger.info(f"Data sorted by {column} in {order} order (rows {offset}-{offset + len(positions)} of {len(df)})")
+        
+        if stream:
+            # Pagination travels in headers since the body is a bare array of rows
+            headers = {'X-Total-Count': str(len(df))}
+            if next_cursor is not None:
+                headers['X-Next-Cursor'] = next_cursor
+            return stream_rows(df, positions, stream, headers=headers)
+        with stage('serialize'):
+            return cache_result(cache_key, rows_response(df.iloc[positions], fmt, {
+                "total": len(df),
+                "offset": offset,
+                "limit": limit,
+                "next_cursor": next_cursor
+            }))
         
     except Exception as e:
         logger.error(f"Error sorting data: {str(e)}")
@@ -414,26 +1053,44 @@ def search_data():
         if not column or not query:
             return jsonify({"error": "Column name and query are required"}), 400
         
-        # Get the latest uploaded file
-        files = [f for f in os.listdir(UPLOAD_FOLDER) if f.endswith('.csv')]
-        if not files:
-            return jsonify({"error": "No CSV files found"}), 404
+        dataset, error = resolve_dataset(data)
+        if error:
+            return error
         
-        latest_file = max(files, key=lambda x: os.path.getctime(os.path.join(UPLOAD_FOLDER, x)))
-        file_path = os.path.join(UPLOAD_FOLDER, latest_file)
+        stream = streaming_mode(request, data)
+        try:
+            fmt = response_format(request, data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        cache_key = ResultCache.make_key('search', dataset, column=column, query=query, format=fmt)
+        if not stream:
+            cached = cached_result(cache_key)
+            if cached is not None:
+                return cached
         
-        df = pd.read_csv(file_path)
+        df = load_dataframe(dataset.path)
         
         if column not in df.columns:
             available_columns = df.columns.tolist()
             return jsonify({"error": f"Column '{column}' not found. Available columns: {available_columns}"}), 400
         
-        # Search the data
-        search_results = df[df[column].astype(str).str.contains(query, case=False, na=False)]
+        # Search the data, narrowing literal queries through the trigram index;
+        # categorical columns only test their distinct values, so they skip it
+        index = None
+        if search_indexes is not None and TrigramIndex.supports(query) and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            index = search_indexes.get(dataset, column, df[column])
+        if index is not None:
+            positions = index.search(query)
+        else:
+            positions = scan_positions(dataset, df, column, query)
+        
+        logger.info(f"Search completed for '{query}' in column '{column}', found {len(positions)} results")
         
-        logger.info(f"Search completed for '{query}' in column '{column}', found {len(search_results)} results")
+        if stream:
+            return stream_rows(df, positions, stream, headers={'X-Total-Count': str(len(positions))})
         
-        return jsonify(search_results.to_dict('records'))
+        with stage('serialize'):
+            return cache_result(cache_key, rows_response(df.iloc[positions], fmt))
         
     except Exception as e:
         logger.error(f"Error searching data: {str(e)}")
@@ -441,7 +1098,12 @@ def search_data():
 
 @app.route('/gradient', methods=['POST'])
 def compute_gradient():
-    """Compute gradient for numeric column"""
+    """Compute gradient for numeric column.
+    
+    With max_points the series is downsampled on the server (LTTB by
+    default, or min/max buckets with "downsample": "minmax") and the
+    original row positions of the kept points are returned alongside.
+    """
     try:
         data = request.get_json()
         if not data:
@@ -451,60 +1113,226 @@ def compute_gradient():
         if not column:
             return jsonify({"error": "Column name is required"}), 400
         
-        # Get the latest uploaded file
-        files = [f for f in os.listdir(UPLOAD_FOLDER) if f.endswith('.csv')]
-        if not files:
-            return jsonify({"error": "No CSV files found"}), 404
-        
-        latest_file = max(files, key=lambda x: os.path.getctime(os.path.join(UPLOAD_FOLDER, x)))
-        file_path = os.path.join(UPLOAD_FOLDER, latest_file)
-        
-        df = pd.read_csv(file_path)
-        
-        if column not in df.columns:
-            available_columns = df.columns.tolist()
-            return jsonify({"error": f"Column '{column}' not found. Available columns: {available_columns}"}), 400
+        max_points = data.get('max_points')
+        method = data.get('downsample', 'lttb')
+        if max_points is not None:
+            try:
+                max_points = int(max_points)
+            except (TypeError, ValueError):
+                return jsonify({"error": "max_points must be an integer"}), 400
+            if max_points < 3:
+                return jsonify({"error": "max_points must be at least 3"}), 400
+        if method not in DOWNSAMPLE_METHODS:
+            return jsonify({"error": f"Unknown downsampling method '{method}'. Use one of {list(DOWNSAMPLE_METHODS)}"}), 400
+        
+        dataset, error = resolve_dataset(data)
+        if error:
+            return error
         
-        # Check if column is numeric
-        if not np.issubdtype(df[column].dtype, np.number):
-            return jsonify({"error": f"Column '{column}' is not numeric"}), 400
+        try:
+            fmt = response_format(request, data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        cache_key = ResultCache.make_key('gradient', dataset, column=column, max_points=max_points,
+                                         method=method if max_points else None, format=fmt)
+        cached = cached_result(cache_key)
+        if cached is not None:
+            return cached
+        
+        # Only the requested column is paged in when a columnar copy exists
+        values = load_numeric_column(dataset.path, column)
+        if values is None:
+            df = load_dataframe(dataset.path)
+            
+            if column not in df.columns:
+                available_columns = df.columns.tolist()
+                return jsonify({"error": f"Column '{column}' not found. Available columns: {available_columns}"}), 400
+            
+            # Check if column is numeric
+            if not pd.api.types.is_numeric_dtype(df[column].dtype) or pd.api.types.is_bool_dtype(df[column].dtype):
+                return jsonify({"error": f"Column '{column}' is not numeric"}), 400
+            
+            values = df[column].values
         
         # Check if we have enough data for gradient
-        if len(df) < 2:
+        if len(values) < 2:
             return jsonify({"error": "Need at least 2 data points for gradient calculation"}), 400
         
         # Compute gradient
-        values = df[column].values
-        gradients = np.gradient(values)
+        with stage('gradient'):
+            # Narrowed (int8, float32, ...) columns still give float64 gradients
+            gradients = np.gradient(np.asarray(values, dtype=float))
         
         logger.info(f"Gradient computed for column '{column}'")
         
-        return jsonify({
-            "column": column,
-            "gradients": gradients.tolist()
-        })
+        # Only the points a chart can show are serialized
+        if max_points is not None and len(gradients) > max_points:
+            with stage('downsample'):
+                positions, sampled = downsample(gradients, max_points, method)
+            logger.info(f"Gradient downsampled from {len(gradients)} to {len(sampled)} points ({method})")
+            with stage('serialize'):
+                return cache_result(cache_key, arrays_response({"gradients": sampled, "positions": positions}, fmt, {
+                    "column": column,
+                    "total_points": len(gradients),
+                    "downsample": method
+                }))
+        
+        with stage('serialize'):
+            return cache_result(cache_key, arrays_response({"gradients": gradients}, fmt, {"column": column}))
         
     except Exception as e:
         logger.error(f"Error computing gradient: {str(e)}")
         return jsonify({"error": f"Error computing gradient: {str(e)}"}), 500
 
+@app.route('/aggregate', methods=['POST'])
+def aggregate_data():
+    """Group rows by one or more columns and aggregate each group.
+    
+    Only the grouped result is serialized, so a chart of sales per
+    product costs one row per product instead of one per sale.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+        
+        group_by = data.get('group_by')
+        if isinstance(group_by, str):
+            group_by = [group_by]
+        if not group_by or not isinstance(group_by, list) or not all(isinstance(col, str) for col in group_by):
+            return jsonify({"error": "group_by must be a column name or a list of column names"}), 400
+        
+        order_by = data.get('order_by')
+        order = data.get('order', 'asc')
+        try:
+            aggregations = parse_aggregations(data.get('aggregations'))
+            limit, offset = parse_page(data)
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"Invalid aggregation parameters: {str(e)}"}), 400
+        
+        dataset, error = resolve_dataset(data)
+        if error:
+            return error
+        
+        try:
+            fmt = response_format(request, data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        cache_key = ResultCache.make_key('aggregate', dataset, group_by=group_by, aggregations=aggregations,
+                                         order_by=order_by, order=order, limit=limit, offset=offset, format=fmt)
+        cached = cached_result(cache_key)
+        if cached is not None:
+            return cached
+        
+        df = load_dataframe(dataset.path)
+        
+        missing = [col for col in group_by + [col for col, _ in aggregations] if col not in df.columns]
+        if missing:
+            available_columns = df.columns.tolist()
+            return jsonify({"error": f"Column '{missing[0]}' not found. Available columns: {available_columns}"}), 400
+        for column, func in aggregations:
+            dtype = df[column].dtype
+            if func in NUMERIC_AGGREGATIONS and not pd.api.types.is_numeric_dtype(dtype):
+                return jsonify({"error": f"Column '{column}' is not numeric, it supports count, min, max and nunique"}), 400
+        
+        # Hash-aggregate all rows, then order and page the (much smaller) grouped result
+        result = aggregate_groups(dataset, df, group_by, aggregations)
+        if order_by is not None:
+            if order_by not in result.columns:
+                return jsonify({"error": f"Cannot order by '{order_by}'. Use one of {result.columns.tolist()}"}), 400
+            result = result.sort_values(order_by, ascending=order.lower() == 'asc', kind='stable', na_position='last')
+        elif order.lower() == 'desc':
+            result = result.iloc[::-1]
+        groups = len(result)
+        if limit is not None or offset:
+            result = result.iloc[offset:offset + limit if limit is not None else None]
+        
+        logger.info(f"Aggregated {len(df)} rows into {groups} groups by {group_by}")
+        
+        with stage('serialize'):
+            return cache_result(cache_key, rows_response(result, fmt, {
+                "group_by": group_by,
+                "groups": groups,
+                "row_count": len(df),
+                "offset": offset,
+                "limit": limit
+            }))
+        
+    except Exception as e:
+        logger.error(f"Error aggregating data: {str(e)}")
+        return jsonify({"error": f"Error aggregating data: {str(e)}"}), 500
+
+@app.route('/histogram', methods=['POST'])
+def get_histogram():
+    """Return precomputed equal-width histograms of numeric columns.
+    
+    Histograms are built at several resolutions while a file is ingested,
+    so answering costs the same for ten rows as for ten million.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        column = data.get('column')
+        bins = data.get('bins', 32)
+        if not isinstance(bins, int) or isinstance(bins, bool) or bins not in HISTOGRAM_RESOLUTIONS:
+            return jsonify({"error": f"bins must be one of {list(HISTOGRAM_RESOLUTIONS)}"}), 400
+        
+        dataset, error = resolve_dataset(data)
+        if error:
+            return error
+        histograms = dataset_histograms(dataset)
+        
+        columns = list(histograms) if column is None else [column]
+        for col in columns:
+            if col not in histograms:
+                available_columns = dataset.columns or load_dataframe(dataset.path).columns.tolist()
+                if col in available_columns:
+                    return jsonify({"error": f"Column '{col}' is not numeric"}), 400
+                return jsonify({"error": f"Column '{col}' not found. Available columns: {available_columns}"}), 400
+        
+        result = {}
+        for col in columns:
+            histogram = histograms[col]
+            step = (histogram["high"] - histogram["low"]) / bins
+            result[col] = {
+                "edges": [histogram["low"] + i * step for i in range(bins)] + [histogram["high"]],
+                "counts": histogram["counts"][bins],
+                "approximate": histogram["approximate"]
+            }
+        
+        return jsonify({
+            "dataset_id": dataset.dataset_id,
+            "bins": bins,
+            "row_count": dataset.row_count,
+            "histograms": result
+        })
+        
+    except Exception as e:
+        logger.error(f"Error building histogram: {str(e)}")
+        return jsonify({"error": f"Error building histogram: {str(e)}"}), 500
+
 @app.route('/stats', methods=['GET'])
 def get_stats():
-    """Get basic statistics about uploaded files"""
+    """Get basic statistics about uploaded files.
+    
+    Answered from the metadata catalog; only files that are new or whose
+    mtime or size changed since they were recorded are parsed again.
+    """
     try:
-        files = [f for f in os.listdir(UPLOAD_FOLDER) if f.endswith('.csv')]
+        folder = upload_folder()
+        files = [f for f in os.listdir(folder) if f.endswith('.csv')]
         if not files:
             return jsonify({"message": "No CSV files found"}), 404
         
+        entries = get_metadata_catalog().reconcile([os.path.join(folder, f) for f in files], profile_csv)
         stats = []
-        for filename in files:
-            file_path = os.path.join(UPLOAD_FOLDER, filename)
-            df = pd.read_csv(file_path)
+        for entry in entries:
+            dataset = dataset_registry.get_by_path(entry["path"])
             stats.append({
-                "filename": filename,
-                "rows": len(df),
-                "columns": len(df.columns),
-                "numeric_columns": len(df.select_dtypes(include=[np.number]).columns)
+                "filename": entry["filename"],
+                "rows": entry["row_count"],
+                "columns": len(entry["columns"]),
+                "numeric_columns": len(entry["numeric_columns"]),
+                "memory": dataset.memory if dataset is not None else None
             })
         
         return jsonify({
@@ -516,6 +1344,14 @@ def get_stats():
         logger.error(f"Error getting stats: {str(e)}")
         return jsonify({"error": f"Error getting stats: {str(e)}"}), 500
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Report the status, progress and result of a background job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job '{job_id}' not found"}), 404
+    return jsonify(job.to_dict())
+
 # Error handlers
 @app.errorhandler(413)
 def too_large(e):
@@ -548,8 +1384,5 @@ if __name__ == '__main__':
     print("   - POST /simple-upload: Simple file upload")
     print("=" * 50)
     
-    # Ensure upload folder exists
-    setup_upload_folder()
-    
     # Use debug=False for production
-    app.run(debug=False, host=host, port=port, threaded=True)
\ No newline at end of file
+    create_app().run(debug=False, host=host, port=port, threaded=True)
\ No newline at end of file
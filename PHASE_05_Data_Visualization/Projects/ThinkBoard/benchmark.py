@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+ThinkBoard Benchmarks
+Compares the summary-statistics engine with the per-column loop it replaced,
+concurrent request work in threads versus the process pool, end-to-end
+endpoint latency against a saved baseline, and cold-start time
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ingest import read_csv_once, summarize_frame
+from offload import ProcessOffload, search_positions_task
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def make_frame(rows, seed=0):
+    """Synthetic frame shaped like Uploads/sample_data2.csv"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "product": rng.choice(['Laptop', 'Mouse', 'Keyboard', 'Monitor', 'Phone'], rows),
+        "price": rng.integers(10, 1500, rows),
+        "quantity": rng.integers(1, 60, rows),
+        "sales": rng.integers(100, 10000, rows),
+        "discount": np.round(rng.random(rows), 2),
+        "date": '2024-01-15'
+    })
+
+
+def summarize_per_column(df):
+    """The original /upload loop: five separate scans per numeric column"""
+    summary = {"mean_values": {}, "median_values": {}, "mode_values": {}, "max_values": {}, "min_values": {}}
+    for col in df.select_dtypes(include=[np.number]).columns:
+        summary["mean_values"][col] = float(df[col].mean())
+        summary["median_values"][col] = float(df[col].median())
+        summary["max_values"][col] = float(df[col].max())
+        summary["min_values"][col] = float(df[col].min())
+        mode_result = df[col].mode()
+        summary["mode_values"][col] = float(mode_result.iloc[0]) if not mode_result.empty else None
+    return summary
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_summary(sizes, repeat=3):
+    """Time the per-column loop against the exact and approximate engines"""
+    results = []
+    for rows in sizes:
+        df = make_frame(rows)
+        row = {
+            "rows": rows,
+            "per_column_s": best_of(lambda: summarize_per_column(df), repeat),
+            "vectorized_s": best_of(lambda: summarize_frame(df), repeat),
+            "approximate_s": best_of(lambda: summarize_frame(df, approximate=True), repeat)
+        }
+        results.append(row)
+        print(f"{rows:>10,} rows | per-column {row['per_column_s']:.4f}s | "
+              f"vectorized {row['vectorized_s']:.4f}s | approximate {row['approximate_s']:.4f}s")
+    return results
+
+
+def run_concurrently(func, requests, concurrency):
+    """Run func requests times on concurrency threads.
+
+    Returns (elapsed seconds, worst delay of a 1ms heartbeat thread); the
+    heartbeat stands in for light requests such as /health that have to
+    wait for the GIL while heavy work runs.
+    """
+    done = threading.Event()
+    worst = [0.0]
+
+    def heartbeat():
+        while not done.is_set():
+            start = time.perf_counter()
+            time.sleep(0.001)
+            worst[0] = max(worst[0], time.perf_counter() - start - 0.001)
+
+    beat = threading.Thread(target=heartbeat)
+    beat.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(lambda _: func(), range(requests)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    beat.join()
+    return elapsed, worst[0]
+
+
+def bench_offload(rows, requests=16, processes=None):
+    """Concurrent /search scans in request threads versus the process pool"""
+    processes = processes or os.cpu_count() or 1
+    tmp_dir = tempfile.mkdtemp()
+    pool = ProcessOffload(processes, 512 * 1024 * 1024, use_columnar=False)
+    try:
+        path = os.path.join(tmp_dir, 'bench.csv')
+        make_frame(rows).to_csv(path, index=False)
+        df, csv_options = read_csv_once(path)
+
+        def in_thread():
+            np.flatnonzero(df['product'].astype(str).str.contains('top', case=False, na=False).to_numpy())
+
+        def in_process():
+            pool.run(search_positions_task, path, csv_options, 'product', 'top')
+
+        # Spawn the workers and let each load the file before timing
+        run_concurrently(in_process, processes * 2, processes)
+
+        results = []
+        for mode, func in [("threads", in_thread), ("processes", in_process)]:
+            elapsed, stall = run_concurrently(func, requests, processes)
+            row = {"mode": mode, "rows": rows, "requests": requests, "workers": processes,
+                   "elapsed_s": elapsed, "requests_per_s": requests / elapsed, "max_stall_s": stall}
+            results.append(row)
+            print(f"{mode:>10} | {requests} scans of {rows:,} rows on {processes} workers | "
+                  f"{row['requests_per_s']:.2f} req/s | heartbeat stalled up to {stall * 1000:.1f}ms")
+        return results
+    finally:
+        pool.shutdown()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def endpoint_requests(filename):
+    """The dashboard's requests, as (name, method, path, kwargs for the test client)"""
+    return [
+        ("sort", 'post', '/sort', {"json": {"column": 'sales', "order": 'desc', "limit": 100}}),
+        ("sort_full", 'post', '/sort', {"json": {"column": 'price', "order": 'asc'}}),
+        ("search", 'post', '/search', {"json": {"column": 'product', "query": 'Laptop'}}),
+        ("gradient", 'post', '/gradient', {"json": {"column": 'sales', "max_points": 1000}}),
+        ("aggregate", 'post', '/aggregate', {"json": {"group_by": 'product', "aggregations": {"sales": ['sum', 'mean'], "price": 'max'}}}),
+        ("histogram", 'post', '/histogram', {"json": {"bins": 32}}),
+        ("stats", 'get', '/stats', {})
+    ]
+
+
+def time_request(client, method, path, kwargs):
+    start = time.perf_counter()
+    response = getattr(client, method)(path, **kwargs)
+    elapsed = time.perf_counter() - start
+    if response.status_code >= 400:
+        raise RuntimeError(f"{method.upper()} {path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return elapsed, len(response.get_data())
+
+
+def bench_endpoints(sizes, repeat=5):
+    """Drive the endpoints through Flask's test client on synthetic uploads.
+
+    Each dataset is uploaded repeat times, then every query endpoint is
+    called repeat times. The first call is reported as cold_s (parsed
+    frame and indexes not built yet) and the median of all calls as
+    median_s; the response cache is off unless RESULT_CACHE_SIZE is set,
+    so repeats still do the work. Peak RSS is the process high-water mark
+    after the endpoint ran. The app is imported from inside a temporary
+    directory so its Uploads folder and catalog never touch the real ones.
+    """
+    tmp_dir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.environ.setdefault('MAX_FILE_SIZE', str(1 << 40))
+    os.environ.setdefault('RESULT_CACHE_SIZE', '0')
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    try:
+        os.chdir(tmp_dir)
+        import app as thinkboard
+        logging.getLogger().setLevel(logging.WARNING)
+        client = thinkboard.app.test_client()
+
+        results = []
+        for rows in sizes:
+            filename = f"bench_{rows}.csv"
+            source = os.path.join(tmp_dir, filename)
+            make_frame(rows).to_csv(source, index=False)
+            file_mb = os.path.getsize(source) / (1024 * 1024)
+
+            def upload():
+                with open(source, 'rb') as f:
+                    return time_request(client, 'post', '/upload', {"data": {"file": (f, filename)}})
+
+            calls = [("upload", upload)]
+            for name, method, path, kwargs in endpoint_requests(filename):
+                calls.append((name, lambda method=method, path=path, kwargs=kwargs: time_request(client, method, path, kwargs)))
+
+            for name, call in calls:
+                timings = []
+                for _ in range(repeat):
+                    elapsed, body_bytes = call()
+                    timings.append(elapsed)
+                median = statistics.median(timings)
+                row = {
+                    "endpoint": name,
+                    "rows": rows,
+                    "cold_s": timings[0],
+                    "median_s": median,
+                    "max_s": max(timings),
+                    "requests_per_s": 1 / median if median else None,
+                    "rows_per_s": rows / median if median else None,
+                    "response_bytes": body_bytes,
+                    "peak_rss_mb": peak_rss_mb()
+                }
+                if name == "upload":
+                    row["file_mb"] = round(file_mb, 1)
+                results.append(row)
+                print(f"{name:>10} | {rows:>10,} rows | cold {row['cold_s'] * 1000:9.1f}ms | "
+                      f"median {median * 1000:9.1f}ms | {row['rows_per_s']:>14,.0f} rows/s | "
+                      f"peak RSS {row['peak_rss_mb']} MB")
+            os.remove(source)
+        return results
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# Run in a fresh interpreter by bench_startup; prints one JSON line of timings
+STARTUP_PROBE = """
+import io, json, sys, time
+started = time.perf_counter()
+if sys.argv[1] == 'eager':
+    import numpy, pandas
+import app as thinkboard
+application = thinkboard.create_app(preload_imports=False)
+ready = time.perf_counter()
+client = application.test_client()
+client.get('/health')
+health = time.perf_counter()
+client.post('/upload', data={'file': (io.BytesIO(b'a,b\\n1,2\\n3,4\\n'), 'startup.csv')})
+upload = time.perf_counter()
+print(json.dumps({"import_s": ready - started, "first_health_s": health - ready, "first_upload_s": upload - health,
+                  "pandas_loaded_at_ready": 'pandas' in sys.modules}))
+"""
+
+
+def bench_startup(repeat=5):
+    """Cold-start cost of the app in fresh interpreters.
+
+    Each run starts a new Python process inside a temporary directory,
+    imports the app and calls create_app (import_s, the time before a
+    server could start listening), then serves a first /health and a
+    first /upload, which is where pandas and NumPy now get imported.
+    The eager mode imports them up front, as the app did before, to show
+    what deferring them saves. process_s includes interpreter start-up.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [here, os.environ.get('PYTHONPATH')])))
+    results = []
+    for mode in ('lazy', 'eager'):
+        runs = []
+        for _ in range(repeat):
+            tmp_dir = tempfile.mkdtemp()
+            try:
+                start = time.perf_counter()
+                output = subprocess.run([sys.executable, '-c', STARTUP_PROBE, mode], cwd=tmp_dir, env=env,
+                                        capture_output=True, text=True, check=True).stdout
+                run = json.loads(output.strip().splitlines()[-1])
+                run["process_s"] = time.perf_counter() - start
+                runs.append(run)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        row = {"mode": mode, "runs": repeat}
+        for key in ("import_s", "first_health_s", "first_upload_s", "process_s"):
+            row[key] = statistics.median(run[key] for run in runs)
+        row["pandas_loaded_at_ready"] = runs[0]["pandas_loaded_at_ready"]
+        results.append(row)
+        print(f"{mode:>6} | ready after {row['import_s'] * 1000:7.1f}ms | first /health {row['first_health_s'] * 1000:6.1f}ms | "
+              f"first /upload {row['first_upload_s'] * 1000:7.1f}ms | whole process {row['process_s'] * 1000:7.1f}ms")
+    return results
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.time()
+    }
+
+
+def compare_to_baseline(results, baseline, tolerance=0.25, min_delta_s=0.002):
+    """Return endpoint rows whose median latency regressed past tolerance.
+
+    Differences below min_delta_s are ignored so sub-millisecond
+    endpoints do not flap on timer noise.
+    """
+    previous = {(row["endpoint"], row["rows"]): row for row in baseline.get("endpoints", [])}
+    regressions = []
+    for row in results:
+        before = previous.get((row["endpoint"], row["rows"]))
+        if before is None:
+            continue
+        delta = row["median_s"] - before["median_s"]
+        if delta > min_delta_s and row["median_s"] > before["median_s"] * (1 + tolerance):
+            regressions.append({
+                "endpoint": row["endpoint"],
+                "rows": row["rows"],
+                "baseline_s": before["median_s"],
+                "median_s": row["median_s"],
+                "slowdown": row["median_s"] / before["median_s"]
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ThinkBoard benchmarks")
+    parser.add_argument('--suite', choices=['all', 'summary', 'offload', 'endpoints', 'startup'], default='all')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--offload-rows', type=int, default=1_000_000)
+    parser.add_argument('--requests', type=int, default=16)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--endpoint-sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help="rows per synthetic upload, e.g. add 10000000 for the large case")
+    parser.add_argument('--endpoint-repeat', type=int, default=5)
+    parser.add_argument('--startup-repeat', type=int, default=5)
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="compare endpoint latencies with a JSON file written by --output")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown before a regression is flagged")
+    args = parser.parse_args()
+
+    report = {"environment": environment()}
+
+    if args.suite in ('all', 'summary'):
+        print("📊 Summary statistics")
+        report["summary"] = bench_summary(args.sizes, args.repeat)
+
+    if args.suite in ('all', 'offload'):
+        print("\n⚙️ Concurrent requests: threads vs process pool")
+        report["offload"] = bench_offload(args.offload_rows, args.requests, args.processes)
+
+    if args.suite in ('all', 'startup'):
+        print("\n⏱️ Cold start")
+        report["startup"] = bench_startup(args.startup_repeat)
+
+    if args.suite in ('all', 'endpoints'):
+        print("\n🌐 Endpoints")
+        report["endpoints"] = bench_endpoints(args.endpoint_sizes, args.endpoint_repeat)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+    if args.baseline and "endpoints" in report:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report["endpoints"], baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) against {args.baseline}:")
+            for row in regressions:
+                print(f"   {row['endpoint']} at {row['rows']:,} rows: {row['baseline_s'] * 1000:.1f}ms -> "
+                      f"{row['median_s'] * 1000:.1f}ms ({row['slowdown']:.2f}x)")
+            sys.exit(1)
+        print(f"\n✅ No endpoint slower than {args.baseline} by more than {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
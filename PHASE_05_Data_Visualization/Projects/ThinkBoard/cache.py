@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+ThinkBoard - Caching
+Process-wide caches shared by the analysis endpoints
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+def _is_memory_mapped(values):
+    while values is not None:
+        if isinstance(values, np.memmap):
+            return True
+        values = getattr(values, 'base', None)
+    return False
+
+
+def mapped_nbytes(df):
+    """Bytes of df held in memory-mapped columns, shared with other processes"""
+    usage = df.memory_usage(index=False, deep=False)
+    return int(sum(usage.iloc[i] for i in range(df.shape[1]) if _is_memory_mapped(df.iloc[:, i].to_numpy())))
+
+
+def frame_nbytes(df):
+    """Estimate the private in-memory size of a DataFrame in bytes.
+
+    Memory-mapped columns live in the OS page cache, shared by every
+    worker process, and are not counted against this process's budget.
+    """
+    return int(df.memory_usage(index=True, deep=True).sum()) - mapped_nbytes(df)
+
+
+class DataFrameCache:
+    """LRU cache of parsed CSV files bounded by a total byte budget.
+
+    Entries are keyed by (path, mtime, size) so a file that changes on disk
+    is never served stale. Cached frames are shared between requests and
+    must be treated as read-only by callers.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # path -> (key, df, nbytes, mapped)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.mapped_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _file_key(path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def get(self, path, loader=None):
+        """Return the parsed frame for path, parsing it only on a miss"""
+        path = os.path.abspath(path)
+        key = self._file_key(path)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == key:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Parse outside the lock so other datasets stay available meanwhile
+        df = loader(path) if loader else pd.read_csv(path)
+        self._store(path, key, df)
+        return df
+
+    def put(self, path, df):
+        """Insert an already parsed frame, replacing any older entry"""
+        path = os.path.abspath(path)
+        self._store(path, self._file_key(path), df)
+
+    def invalidate(self, path):
+        """Drop the cached frame for path, if any"""
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.pop(path, None)
+            if entry is not None:
+                self.current_bytes -= entry[2]
+                self.mapped_bytes -= entry[3]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.mapped_bytes = 0
+
+    def _store(self, path, key, df):
+        nbytes = frame_nbytes(df)
+        mapped = mapped_nbytes(df)
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self.current_bytes -= old[2]
+                self.mapped_bytes -= old[3]
+            if nbytes > self.max_bytes:
+                # Larger than the whole budget, serve it uncached
+                return
+            self._entries[path] = (key, df, nbytes, mapped)
+            self.current_bytes += nbytes
+            self.mapped_bytes += mapped
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, (_, _, evicted_bytes, evicted_mapped) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+                self.mapped_bytes -= evicted_mapped
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "mapped_bytes": self.mapped_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class ByteBudgetLRU:
+    """Thread-safe LRU mapping that evicts once the summed item sizes exceed max_bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, nbytes):
+        """Insert value; values larger than the whole budget are not kept"""
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.current_bytes -= entry[1]
+
+    def discard_where(self, predicate):
+        """Remove every entry whose key matches predicate"""
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                self.current_bytes -= self._entries.pop(key)[1]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class CachedResult:
+    """A serialized response body ready to be sent again, plus compressed copies"""
+
+    def __init__(self, body, mimetype, headers=None):
+        self.body = body
+        self.mimetype = mimetype
+        self.headers = headers or {}
+        self.encoded = {}  # Content-Encoding -> compressed body
+        self.created_at = time.monotonic()
+
+    @property
+    def nbytes(self):
+        return len(self.body) + sum(len(data) for data in self.encoded.values())
+
+
+class ResultCache:
+    """TTL + byte-budget LRU cache of serialized endpoint responses.
+
+    Keys combine the dataset path and version with the endpoint and its
+    normalized parameters, so a re-upload can never serve old results.
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.ttl = ttl
+        self._entries = ByteBudgetLRU(max_bytes)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(endpoint, dataset, **params):
+        return (dataset.path, dataset.version, endpoint, json.dumps(params, sort_keys=True, default=str))
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry.created_at > self.ttl:
+            self._entries.discard(key)
+            with self._lock:
+                self.expirations += 1
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def put(self, key, body, mimetype, headers=None):
+        entry = CachedResult(body, mimetype, headers)
+        self._entries.put(key, entry, entry.nbytes)
+        return entry
+
+    def add_encoding(self, key, entry, encoding, data):
+        """Keep a compressed copy of entry's body, counted against the budget"""
+        entry.encoded[encoding] = data
+        if self._entries.get(key) is entry:
+            self._entries.put(key, entry, entry.nbytes)
+
+    def invalidate(self, path):
+        """Drop every cached result for the dataset stored at path"""
+        self._entries.discard_where(lambda key: key[0] == path)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._entries.current_bytes,
+                "max_bytes": self._entries.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "evictions": self._entries.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
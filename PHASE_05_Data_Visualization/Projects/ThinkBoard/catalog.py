@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+ThinkBoard - Metadata Catalog
+Persistent record of the schema of every uploaded CSV
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    row_count INTEGER,
+    columns TEXT NOT NULL,
+    dtypes TEXT NOT NULL,
+    numeric_columns TEXT NOT NULL,
+    csv_options TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+def _file_key(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class MetadataCatalog:
+    """SQLite catalog of row counts, columns and dtypes per uploaded file.
+
+    Each record carries the file's mtime and size when it was written, so
+    a file that changed on disk is detected by a stat call and only that
+    file is profiled again. The database lives next to the uploads and
+    survives restarts; connections are opened per call so several worker
+    processes can share it.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.reprofiled = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, path, schema, csv_options=None):
+        """Store the schema of the file at path as it is on disk now.
+
+        schema is a dict with columns, dtypes, numeric_columns and row_count.
+        """
+        path = os.path.abspath(path)
+        mtime_ns, size = _file_key(path)
+        row = (path, os.path.basename(path), mtime_ns, size, schema.get("row_count"),
+               json.dumps(schema.get("columns", [])), json.dumps(schema.get("dtypes", {})),
+               json.dumps(schema.get("numeric_columns", [])), json.dumps(csv_options or {}), time.time())
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+        return self._entry(row)
+
+    def record_dataset(self, dataset):
+        """Store the schema a registered dataset was uploaded with"""
+        self.record(dataset.path, {
+            "columns": dataset.columns,
+            "dtypes": dataset.dtypes,
+            "numeric_columns": dataset.numeric_columns,
+            "row_count": dataset.row_count
+        }, dataset.csv_options)
+
+    @staticmethod
+    def _entry(row):
+        return {
+            "path": row[0],
+            "filename": row[1],
+            "row_count": row[4],
+            "columns": json.loads(row[5]),
+            "dtypes": json.loads(row[6]),
+            "numeric_columns": json.loads(row[7]),
+            "csv_options": json.loads(row[8]),
+            "updated_at": row[9]
+        }
+
+    def get(self, path):
+        """Return the record for path, or None when missing or stale"""
+        path = os.path.abspath(path)
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM files WHERE path = ?", (path,)).fetchone()
+        with self._lock:
+            self.lookups += 1
+        if row is None or (row[2], row[3]) != _file_key(path):
+            return None
+        return self._entry(row)
+
+    def reconcile(self, paths, profile):
+        """Return records for every path, profiling only new or changed files.
+
+        profile(path) must return (schema, csv_options). Records of files
+        that are no longer in paths are removed from the catalog.
+        """
+        paths = [os.path.abspath(path) for path in paths]
+        with self._connect() as conn:
+            rows = {row[0]: row for row in conn.execute("SELECT * FROM files")}
+
+        entries = []
+        for path in paths:
+            row = rows.get(path)
+            if row is not None and (row[2], row[3]) == _file_key(path):
+                entries.append(self._entry(row))
+                continue
+            schema, csv_options = profile(path)
+            entries.append(self.record(path, schema, csv_options))
+            with self._lock:
+                self.reprofiled += 1
+
+        # Only forget files from the folders being reconciled
+        listed = set(paths)
+        folders = {os.path.dirname(path) for path in paths}
+        gone = [path for path in rows if path not in listed and os.path.dirname(path) in folders]
+        if gone:
+            with self._connect() as conn:
+                conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in gone])
+        with self._lock:
+            self.lookups += len(paths)
+        return entries
+
+    def remove(self, path):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM files WHERE path = ?", (os.path.abspath(path),))
+
+    def stats(self):
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        with self._lock:
+            return {
+                "entries": entries,
+                "lookups": self.lookups,
+                "reprofiled": self.reprofiled
+            }
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+ThinkBoard - Columnar Sidecar Store
+Binary per-column copies of uploaded CSVs that are read memory-mapped
+"""
+
+import json
+import logging
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, workers may parse concurrently
+    fcntl = None
+
+from lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+logger = logging.getLogger(__name__)
+
+SIDECAR_DIR = '.columnar'
+META_FILE = 'meta.json'
+
+
+class ColumnarStore:
+    """Stores each column of a parsed CSV as a .npy file next to the upload.
+
+    Numeric and boolean columns are saved as raw arrays and opened with
+    mmap_mode='r', so a request that only needs one column only pages in
+    that column. Text columns are saved as integer codes plus a table of
+    distinct values. The sidecar is tied to the CSV's mtime and size and
+    is ignored once the CSV changes.
+
+    Because the arrays are mapped from files, every worker process that
+    opens the same dataset shares one copy of its numeric columns in the
+    OS page cache. The kernel keeps a replaced or removed sidecar alive
+    until its last mapping is closed.
+    """
+
+    def sidecar_path(self, csv_path):
+        folder, filename = os.path.split(os.path.abspath(csv_path))
+        return os.path.join(folder, SIDECAR_DIR, filename)
+
+    @staticmethod
+    def _source_key(csv_path):
+        st = os.stat(csv_path)
+        return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+    @contextmanager
+    def _locked(self, csv_path):
+        """Hold an exclusive cross-process lock on the sidecar of csv_path"""
+        if fcntl is None:
+            yield
+            return
+        lock_path = self.sidecar_path(csv_path) + '.lock'
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        with open(lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def materialize(self, csv_path, loader):
+        """Return the frame of csv_path mapped from its sidecar, writing it at most once.
+
+        Only the first process to get here calls loader() and writes the
+        columnar copy; concurrent callers wait on a file lock and then map
+        the result instead of parsing the CSV themselves. Falls back to the
+        loaded frame when some columns cannot be stored.
+        """
+        df = None
+        with self._locked(csv_path):
+            if self.read_meta(csv_path) is None:
+                df = loader()
+                self.write(csv_path, df)
+        mapped = self.load_frame(csv_path)
+        if mapped is not None:
+            return mapped
+        return df if df is not None else loader()
+
+    def write(self, csv_path, df):
+        """Write the columnar copy of df for csv_path, replacing any old one"""
+        target = self.sidecar_path(csv_path)
+        tmp = f"{target}.tmp-{uuid.uuid4().hex[:8]}"
+        os.makedirs(tmp)
+        try:
+            columns = []
+            for i, col in enumerate(df.columns):
+                columns.append(self._write_column(tmp, i, df[col]))
+            meta = {
+                "source": self._source_key(csv_path),
+                "row_count": len(df),
+                "columns": columns
+            }
+            with open(os.path.join(tmp, META_FILE), 'w') as f:
+                json.dump(meta, f)
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            os.rename(tmp, target)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        return target
+
+    def _write_column(self, folder, i, series):
+        name = f"col_{i:04d}"
+        entry = {"name": str(series.name), "dtype": str(series.dtype), "file": None, "kind": None}
+        if pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+            np.save(os.path.join(folder, f"{name}.npy"), series.to_numpy())
+            entry.update(file=f"{name}.npy", kind="array")
+            return entry
+
+        categorical = pd.Categorical(series)
+        categories = categorical.categories
+        if not all(isinstance(value, str) for value in categories):
+            # Mixed-type text columns keep going through the CSV parser
+            return entry
+        np.save(os.path.join(folder, f"{name}.npy"), categorical.codes)
+        np.save(os.path.join(folder, f"{name}.categories.npy"), np.asarray(categories, dtype=str))
+        entry.update(file=f"{name}.npy", kind="codes")
+        return entry
+
+    def read_meta(self, csv_path):
+        """Return the sidecar metadata, or None when missing or stale"""
+        meta_path = os.path.join(self.sidecar_path(csv_path), META_FILE)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("source") != self._source_key(csv_path):
+            return None
+        return meta
+
+    def load_column(self, csv_path, column, meta=None):
+        """Return a memory-mapped numeric column, or None if not available"""
+        meta = meta or self.read_meta(csv_path)
+        if meta is None:
+            return None
+        for entry in meta["columns"]:
+            if entry["name"] == column and entry["kind"] == "array":
+                return np.load(os.path.join(self.sidecar_path(csv_path), entry["file"]), mmap_mode='r')
+        return None
+
+    def load_frame(self, csv_path):
+        """Assemble the whole frame from the sidecar, or None if not available"""
+        meta = self.read_meta(csv_path)
+        if meta is None or any(entry["kind"] is None for entry in meta["columns"]):
+            return None
+
+        folder = self.sidecar_path(csv_path)
+        data = {}
+        for entry in meta["columns"]:
+            values = np.load(os.path.join(folder, entry["file"]), mmap_mode='r')
+            if entry["kind"] == "codes":
+                categories = np.load(os.path.join(folder, entry["file"].replace('.npy', '.categories.npy')))
+                decoded = pd.Series(pd.Categorical.from_codes(values, categories.astype(object)))
+                values = decoded.astype(object) if entry["dtype"] == 'object' else decoded.astype(entry["dtype"])
+            data[entry["name"]] = values
+        return pd.DataFrame(data, columns=[entry["name"] for entry in meta["columns"]], copy=False)
+
+    def save_array(self, csv_path, name, values):
+        """Persist a derived array (e.g. an index) in a fresh sidecar.
+
+        Returns False when there is no up-to-date sidecar to attach it to.
+        The array goes away with the sidecar when the CSV is re-uploaded.
+        """
+        if self.read_meta(csv_path) is None:
+            return False
+        path = os.path.join(self.sidecar_path(csv_path), f"{name}.npy")
+        tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}.npy"
+        np.save(tmp, values)
+        os.replace(tmp, path)
+        return True
+
+    def load_array(self, csv_path, name):
+        """Memory-map an array saved with save_array, or None if missing or stale"""
+        if self.read_meta(csv_path) is None:
+            return None
+        path = os.path.join(self.sidecar_path(csv_path), f"{name}.npy")
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode='r')
+
+    def remove(self, csv_path):
+        shutil.rmtree(self.sidecar_path(csv_path), ignore_errors=True)
+
+
+def read_csv_frame(csv_path, store=None, prepare=None, **read_kwargs):
+    """Load a CSV, preferring its columnar sidecar over re-parsing the text.
+
+    Without an up-to-date sidecar the CSV is parsed once and the sidecar
+    written, so other worker processes map it instead of parsing again.
+    prepare, if given, is applied to a freshly parsed frame (e.g. to
+    narrow its dtypes) before it is stored or returned.
+    """
+    def parse():
+        df = pd.read_csv(csv_path, **read_kwargs)
+        return prepare(df) if prepare is not None else df
+
+    if store is not None:
+        try:
+            df = store.load_frame(csv_path)
+            if df is not None:
+                return df
+            return store.materialize(csv_path, parse)
+        except Exception as e:
+            logger.warning(f"Could not read columnar copy of {csv_path}: {e}")
+    return parse()
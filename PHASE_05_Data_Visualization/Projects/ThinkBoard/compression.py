@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+ThinkBoard - Response Compression
+Content-Encoding negotiation and ETags for responses derived from datasets
+"""
+
+import gzip
+import hashlib
+
+try:
+    import brotli
+except ImportError:  # Optional: pip install brotli to offer br as well as gzip
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'application/vnd.thinkboard.columns+json',
+    'text/csv',
+    'text/plain',
+    'text/html',
+    'text/css',
+    'text/javascript',
+    'application/javascript'
+}
+
+
+def available_encodings():
+    """Encodings this server can produce, most preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(body, encoding, level=6):
+    """Encode body with gzip or br; level is 1-9 for gzip and 0-11 for br"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=min(level, 11))
+    if encoding == 'gzip':
+        # A fixed mtime keeps the output, and so any cached copy, deterministic
+        return gzip.compress(body, compresslevel=min(max(level, 1), 9), mtime=0)
+    raise ValueError(f"Unsupported encoding '{encoding}'")
+
+
+def decompress(body, encoding):
+    if encoding == 'br':
+        return brotli.decompress(body)
+    if encoding == 'gzip':
+        return gzip.decompress(body)
+    raise ValueError(f"Unsupported encoding '{encoding}'")
+
+
+def etag_for(*parts):
+    """Opaque validator for a response determined entirely by parts"""
+    return hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=16).hexdigest()
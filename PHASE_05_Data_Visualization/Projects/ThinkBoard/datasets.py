@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+ThinkBoard - Dataset Registry
+In-memory index of uploaded datasets addressed by dataset ID
+"""
+
+import os
+import threading
+import time
+import uuid
+
+from lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+class Dataset:
+    """An uploaded CSV file and the schema it had when it was registered"""
+
+    def __init__(self, dataset_id, path):
+        self.dataset_id = dataset_id
+        self.path = path
+        self.filename = os.path.basename(path)
+        self.version = 0
+        self.columns = []
+        self.dtypes = {}
+        self.numeric_columns = []
+        self.row_count = None
+        self.csv_options = {}
+        self.memory = None
+        self.histograms = None
+        self.updated_at = None
+
+    def update_schema(self, df):
+        """Record the schema of a freshly parsed frame"""
+        self.set_schema(
+            columns=df.columns.tolist(),
+            dtypes={col: str(dtype) for col, dtype in df.dtypes.items()},
+            numeric_columns=df.select_dtypes(include=[np.number]).columns.tolist(),
+            row_count=len(df)
+        )
+
+    def set_schema(self, columns, dtypes, numeric_columns, row_count):
+        self.columns = columns
+        self.dtypes = dtypes
+        self.numeric_columns = numeric_columns
+        self.row_count = row_count
+
+    def to_dict(self):
+        return {
+            "dataset_id": self.dataset_id,
+            "filename": self.filename,
+            "version": self.version,
+            "columns": self.columns,
+            "dtypes": self.dtypes,
+            "numeric_columns": self.numeric_columns,
+            "row_count": self.row_count,
+            "memory": self.memory,
+            "updated_at": self.updated_at
+        }
+
+
+class DatasetRegistry:
+    """Thread-safe registry mapping dataset IDs and paths to datasets.
+
+    Re-registering a path keeps its dataset ID and bumps its version, so
+    anything derived from a dataset can be keyed by (dataset_id, version).
+    """
+
+    def __init__(self):
+        self._by_id = {}
+        self._by_path = {}
+        self._latest_id = None
+        self._lock = threading.Lock()
+
+    def register(self, path, df=None, schema=None, csv_options=None, memory=None, histograms=None):
+        """Register (or re-register) the file at path and return its dataset.
+
+        The schema is taken from df when given, otherwise from a schema
+        dict with the keyword arguments of Dataset.set_schema. csv_options
+        are the pd.read_csv arguments needed to parse the file again.
+        memory is the report from ingest.optimize_dtypes, if it ran, and
+        histograms the per-column histograms built during ingestion.
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            dataset = self._by_path.get(path)
+            if dataset is None:
+                dataset = Dataset(uuid.uuid4().hex[:12], path)
+                self._by_path[path] = dataset
+                self._by_id[dataset.dataset_id] = dataset
+            dataset.version += 1
+            dataset.updated_at = time.time()
+            if df is not None:
+                dataset.update_schema(df)
+            elif schema is not None:
+                dataset.set_schema(**schema)
+            if csv_options is not None:
+                dataset.csv_options = csv_options
+            dataset.memory = memory
+            dataset.histograms = histograms
+            self._latest_id = dataset.dataset_id
+            return dataset
+
+    def get(self, dataset_id):
+        with self._lock:
+            return self._by_id.get(dataset_id)
+
+    def get_by_path(self, path):
+        with self._lock:
+            return self._by_path.get(os.path.abspath(path))
+
+    def latest(self):
+        """Return the most recently registered dataset, if any"""
+        with self._lock:
+            return self._by_id.get(self._latest_id)
+
+    def remove(self, dataset_id):
+        with self._lock:
+            dataset = self._by_id.pop(dataset_id, None)
+            if dataset is not None:
+                self._by_path.pop(dataset.path, None)
+                if self._latest_id == dataset_id:
+                    self._latest_id = None
+            return dataset
+
+    def all(self):
+        with self._lock:
+            return list(self._by_id.values())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._by_id)
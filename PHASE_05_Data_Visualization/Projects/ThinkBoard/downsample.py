@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+ThinkBoard - Downsampling
+Reduces long numeric series to a chart-sized set of points
+"""
+
+from lazy import lazy_import
+
+np = lazy_import('numpy')
+
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+
+
+def lttb_indices(values, max_points):
+    """Positions kept by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept; the rest are split into
+    max_points - 2 equal buckets and each bucket keeps the point forming
+    the largest triangle with the previously kept point and the mean of
+    the next bucket. Buckets are processed in order because each choice
+    depends on the previous one, but the work inside a bucket is a single
+    vectorized pass over a view of the series.
+    """
+    y = np.asarray(values, dtype=float)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+
+    buckets = max_points - 2
+    edges = np.linspace(1, n - 1, buckets + 1).astype(np.intp)
+
+    # Mean of every bucket from cumulative sums, ignoring missing values
+    finite = np.isfinite(y)
+    filled = np.where(finite, y, 0.0)
+    sums = np.concatenate([[0.0], np.cumsum(filled)])
+    counts = np.concatenate([[0], np.cumsum(finite)])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_y = (sums[edges[1:]] - sums[edges[:-1]]) / (counts[edges[1:]] - counts[edges[:-1]])
+    mean_x = (edges[:-1] + edges[1:] - 1) / 2.0
+    # The last bucket looks ahead to the final point
+    next_x = np.append(mean_x[1:], n - 1)
+    next_y = np.append(mean_y[1:], filled[n - 1])
+
+    kept = np.empty(max_points, dtype=np.intp)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(buckets):
+        start, stop = edges[i], edges[i + 1]
+        ax, ay = float(a), filled[a]
+        cx, cy = next_x[i], next_y[i] if np.isfinite(next_y[i]) else ay
+        # Twice the triangle area is linear in the candidate point
+        area = np.abs((ax - cx) * (filled[start:stop] - ay) - (ax - np.arange(start, stop)) * (cy - ay))
+        area[~finite[start:stop]] = -1.0
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def minmax_indices(values, max_points):
+    """Positions of the minimum and maximum of each of max_points // 2 buckets.
+
+    Keeps every peak and trough visible, which suits noisy series better
+    than LTTB. Buckets have equal width so the whole series is reshaped
+    into a 2-D block and reduced along rows in one vectorized pass.
+    """
+    y = np.asarray(values, dtype=float)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+
+    width = -(-n // (max_points // 2))
+    rows = -(-n // width)
+    padded = np.full(rows * width, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(rows, width)
+    missing = np.isnan(blocks)
+    offsets = np.arange(rows) * width
+    lows = offsets + np.argmin(np.where(missing, np.inf, blocks), axis=1)
+    highs = offsets + np.argmax(np.where(missing, -np.inf, blocks), axis=1)
+    kept = np.unique(np.concatenate([lows, highs]))
+    return kept[kept < n]
+
+
+def downsample(values, max_points, method='lttb'):
+    """Return (positions, values) reduced to at most max_points points"""
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}'. Use one of {list(DOWNSAMPLE_METHODS)}")
+    if max_points < 3:
+        raise ValueError("max_points must be at least 3")
+    values = np.asarray(values)
+    if method == 'minmax':
+        positions = minmax_indices(values, max_points)
+    else:
+        positions = lttb_indices(values, max_points)
+    return positions, values[positions]
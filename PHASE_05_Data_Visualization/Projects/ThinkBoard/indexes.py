@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+ThinkBoard - Indexes
+Per-dataset column indexes that answer repeat queries without rescanning
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from collections import defaultdict
+
+from cache import ByteBudgetLRU
+from lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+logger = logging.getLogger(__name__)
+
+
+def _index_name(column, ascending):
+    digest = hashlib.sha1(str(column).encode()).hexdigest()[:12]
+    return f"sort_{digest}_{'asc' if ascending else 'desc'}"
+
+
+class SortIndexCache:
+    """Sort permutations per (dataset version, column, direction).
+
+    A permutation lists row positions in sort order, so a sorted page is
+    just a slice of it. Permutations are kept in memory under a byte
+    budget and, when a columnar store is given, persisted next to the
+    dataset's sidecar so they survive restarts and are dropped together
+    with it on re-upload. An index is built once the same sort has been
+    requested build_after times; until then callers use partial selection.
+    """
+
+    def __init__(self, max_bytes, store=None, build_after=2):
+        self.store = store
+        self.build_after = build_after
+        self._entries = ByteBudgetLRU(max_bytes)
+        self._demand = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+
+    @staticmethod
+    def _key(dataset, column, ascending):
+        return (dataset.path, dataset.version, column, bool(ascending))
+
+    def lookup(self, dataset, column, ascending):
+        """Return the permutation for this sort if one is available"""
+        key = self._key(dataset, column, ascending)
+        permutation = self._entries.get(key)
+        if permutation is not None:
+            with self._lock:
+                self.hits += 1
+            return permutation
+
+        if self.store is not None:
+            try:
+                permutation = self.store.load_array(dataset.path, _index_name(column, ascending))
+            except Exception as e:
+                logger.warning(f"Could not load sort index for '{column}': {e}")
+                permutation = None
+            if permutation is not None:
+                self._entries.put(key, permutation, permutation.nbytes)
+                with self._lock:
+                    self.hits += 1
+                return permutation
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def should_build(self, dataset, column, ascending):
+        """Record demand for a sort and report whether it is worth indexing"""
+        key = self._key(dataset, column, ascending)
+        with self._lock:
+            self._demand[key] = self._demand.get(key, 0) + 1
+            return self._demand[key] >= self.build_after
+
+    def build(self, dataset, column, ascending, positions):
+        """Store the full sort order of a column as a compact permutation"""
+        dtype = np.int32 if len(positions) < 2 ** 31 else np.int64
+        permutation = np.asarray(positions, dtype=dtype)
+        key = self._key(dataset, column, ascending)
+        self._entries.put(key, permutation, permutation.nbytes)
+        with self._lock:
+            self.builds += 1
+            self._demand.pop(key, None)
+        if self.store is not None:
+            try:
+                self.store.save_array(dataset.path, _index_name(column, ascending), permutation)
+            except Exception as e:
+                logger.warning(f"Could not persist sort index for '{column}': {e}")
+        return permutation
+
+    def invalidate(self, path):
+        """Drop every index of the dataset stored at path"""
+        self._entries.discard_where(lambda key: key[0] == path)
+        with self._lock:
+            for key in [k for k in self._demand if k[0] == path]:
+                del self._demand[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._entries.current_bytes,
+                "max_bytes": self._entries.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "builds": self.builds
+            }
+
+
+REGEX_METACHARACTERS = set('.^$*+?{}[]\\|()')
+
+try:
+    from re._casefix import _EXTRA_CASES
+except ImportError:  # Python < 3.11 keeps the table in sre_compile
+    from sre_compile import _ignorecase_fixes as _EXTRA_CASES
+
+# re.IGNORECASE also equates characters str.lower() keeps apart ('ı' and 'i',
+# 'ſ' and 's'); map each such group onto one character so trigrams agree with it
+CASE_EQUIVALENTS = {code: min(chr(c) for c in (code,) + equivalents)
+                    for code, equivalents in _EXTRA_CASES.items()}
+
+
+def fold_case(value):
+    """Lower-case value the way re.IGNORECASE compares it, or None if lowering changes its length"""
+    lowered = value.lower()
+    if len(lowered) != len(value):
+        return None
+    return lowered.translate(CASE_EQUIVALENTS)
+
+
+class TrigramIndex:
+    """Case-insensitive trigram inverted index over one text column.
+
+    Distinct values are indexed rather than rows: each case-folded
+    trigram maps to the IDs of the distinct values containing it, and
+    each row stores the ID of its value. A literal query of three or more
+    characters intersects the postings of its trigrams, verifies the few
+    surviving values and expands them back to row positions. Values that
+    cannot be folded character for character (such as 'İ') are always
+    verified instead.
+    """
+
+    def __init__(self, series):
+        codes, uniques = pd.factorize(series.astype(str))
+        self.codes = codes.astype(np.int32 if len(uniques) < 2 ** 31 else np.int64)
+        self.values = np.asarray(uniques, dtype=object)
+
+        postings = defaultdict(list)
+        unfolded = []
+        for value_id, value in enumerate(self.values):
+            folded = fold_case(value)
+            if folded is None:
+                unfolded.append(value_id)
+                continue
+            for gram in {folded[i:i + 3] for i in range(len(folded) - 2)}:
+                postings[gram].append(value_id)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.unfolded = np.array(unfolded, dtype=np.int32)
+
+    @property
+    def nbytes(self):
+        strings = sum(len(value) for value in self.values) + 56 * len(self.values)
+        postings = sum(ids.nbytes + 64 for ids in self.postings.values()) + self.unfolded.nbytes
+        return self.codes.nbytes + postings + strings
+
+    @staticmethod
+    def supports(query):
+        """Whether a query can be answered from trigrams"""
+        return (len(query) >= 3 and not REGEX_METACHARACTERS.intersection(query)
+                and fold_case(query) is not None)
+
+    def search(self, query):
+        """Row positions whose value contains query, ignoring case"""
+        folded = fold_case(query)
+        grams = sorted({folded[i:i + 3] for i in range(len(folded) - 2)},
+                       key=lambda gram: len(self.postings.get(gram, ())))
+        candidates = None
+        for gram in grams:
+            ids = self.postings.get(gram)
+            if ids is None:
+                candidates = np.empty(0, dtype=np.int32)
+                break
+            candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+            if candidates.size == 0:
+                break
+        candidates = np.union1d(candidates, self.unfolded)
+
+        # Trigrams only narrow the candidates; confirm with the same match the scan uses
+        pattern = re.compile(query, re.IGNORECASE)
+        matched = [value_id for value_id in candidates if pattern.search(self.values[value_id])]
+        if not matched:
+            return np.empty(0, dtype=np.intp)
+        return np.flatnonzero(np.isin(self.codes, matched))
+
+
+class SearchIndexCache:
+    """Trigram indexes per (dataset version, column) under a byte budget.
+
+    Columns shorter than min_rows are scanned directly, an index there
+    costs more than it saves.
+    """
+
+    def __init__(self, max_bytes, min_rows=50_000):
+        self.min_rows = min_rows
+        self._entries = ByteBudgetLRU(max_bytes)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, dataset, column, series):
+        """Return the index for a column, building it on first use"""
+        if len(series) < self.min_rows:
+            return None
+        key = (dataset.path, dataset.version, column)
+        index = self._entries.get(key)
+        if index is not None:
+            with self._lock:
+                self.hits += 1
+            return index
+        index = TrigramIndex(series)
+        self._entries.put(key, index, index.nbytes)
+        with self._lock:
+            self.builds += 1
+        logger.info(f"Built trigram index for column '{column}' ({index.nbytes} bytes)")
+        return index
+
+    def invalidate(self, path):
+        self._entries.discard_where(lambda key: key[0] == path)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._entries.current_bytes,
+                "max_bytes": self._entries.max_bytes,
+                "hits": self.hits,
+                "builds": self.builds
+            }
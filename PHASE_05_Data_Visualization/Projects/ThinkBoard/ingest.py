@@ -0,0 +1,609 @@
+#!/usr/bin/env python3
+"""
+ThinkBoard - Ingestion
+Chunked CSV ingestion with bounded-memory summary statistics
+"""
+
+import codecs
+import csv
+import logging
+
+from lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_ROWS = 100_000
+SNIFF_BYTES = 64 * 1024
+SNIFF_DELIMITERS = ',;\t|'
+QUANTILE_SKETCH_SIZE = 4096
+FREQUENCY_SKETCH_SIZE = 1024
+APPROX_SAMPLE_ROWS = 200_000
+CATEGORY_MAX_RATIO = 0.05
+HISTOGRAM_RESOLUTIONS = (8, 16, 32, 64, 128)
+
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def sniff_csv(file_path, sample_bytes=SNIFF_BYTES):
+    """Detect encoding, delimiter and header from the start of a CSV file.
+
+    Returns keyword arguments for pd.read_csv. Files without a header row
+    get generated column names (column_1, column_2, ...).
+    """
+    with open(file_path, 'rb') as f:
+        sample = f.read(sample_bytes)
+        complete = not f.read(1)
+
+    if sample.startswith(codecs.BOM_UTF8):
+        encoding = 'utf-8-sig'
+    else:
+        encoding = 'utf-8'
+    try:
+        # An incremental decoder tolerates a character cut off at the end of the sample
+        text = codecs.getincrementaldecoder(encoding)().decode(sample, final=complete)
+    except UnicodeDecodeError:
+        encoding = 'latin-1'
+        text = sample.decode(encoding)
+
+    if not complete and '\n' in text:
+        # Only sniff whole lines
+        text = text[:text.rfind('\n') + 1]
+
+    options = {"encoding": encoding, "sep": ',', "header": 0}
+    if not text.strip():
+        return options
+
+    try:
+        dialect = csv.Sniffer().sniff(text, delimiters=SNIFF_DELIMITERS)
+        options["sep"] = dialect.delimiter
+    except csv.Error:
+        pass
+
+    first_row = next(csv.reader(text.splitlines(), delimiter=options["sep"]), [])
+    try:
+        has_header = csv.Sniffer().has_header(text)
+    except csv.Error:
+        has_header = True
+    # Column names are almost never plain numbers, so require one before dropping the header
+    if not has_header and any(_is_number(field) for field in first_row):
+        options["header"] = None
+        options["names"] = [f"column_{i + 1}" for i in range(len(first_row))]
+    return options
+
+
+def read_csv_once(file_path, options=None):
+    """Parse a CSV exactly once using sniffed options.
+
+    Returns (df, options). If the sniffed encoding turns out to be wrong
+    further into the file, the parse is retried once as latin-1.
+    """
+    options = options or sniff_csv(file_path)
+    try:
+        return pd.read_csv(file_path, **options), options
+    except UnicodeDecodeError as e:
+        logger.warning(f"{file_path} is not {options['encoding']} past the sniffed prefix ({e}), using latin-1")
+        options = dict(options, encoding='latin-1')
+        return pd.read_csv(file_path, **options), options
+
+
+def validate_dataframe(df):
+    """Validate a parsed CSV frame"""
+    if df.empty:
+        return False, "CSV file is empty"
+    if len(df.columns) == 0:
+        return False, "CSV file has no columns"
+    return True, "Valid CSV file"
+
+
+def _narrow_column(series, category_ratio):
+    """A smaller-dtype copy of series holding the same values, or None"""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(dtype) or len(series) == 0:
+        return None
+    if isinstance(dtype, np.dtype) and dtype.kind in 'iu':
+        values = series.to_numpy()
+        low, high = values.min(), values.max()
+        for target in (np.int8, np.int16, np.int32):
+            info = np.iinfo(target)
+            if np.dtype(target).itemsize < dtype.itemsize and info.min <= low and high <= info.max:
+                return series.astype(target)
+        return None
+    if isinstance(dtype, np.dtype) and dtype.kind == 'f':
+        if dtype.itemsize <= 4:
+            return None
+        values = series.to_numpy()
+        with np.errstate(over='ignore'):
+            narrowed = values.astype(np.float32)
+        # Only when every value survives the round trip, so no result changes
+        if np.array_equal(narrowed.astype(dtype), values, equal_nan=True):
+            return pd.Series(narrowed, index=series.index, name=series.name)
+        return None
+    if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        if series.nunique(dropna=True) <= category_ratio * len(series):
+            return series.astype('category')
+    return None
+
+
+def column_bytes(series, sample_rows=APPROX_SAMPLE_ROWS):
+    """Memory held by a column, including the strings of text columns.
+
+    Text columns longer than sample_rows are measured on an evenly spaced
+    sample and scaled up, since sizing every string is a Python-level loop.
+    """
+    n = len(series)
+    if sample_rows and n > sample_rows and (pd.api.types.is_object_dtype(series.dtype)
+                                            or pd.api.types.is_string_dtype(series.dtype)):
+        sample = series.iloc[::n // sample_rows]
+        return int(sample.memory_usage(index=False, deep=True) * n / len(sample))
+    return int(series.memory_usage(index=False, deep=True))
+
+
+def optimize_dtypes(df, category_ratio=CATEGORY_MAX_RATIO):
+    """Store a parsed frame in the smallest dtypes that hold its values.
+
+    Integers are downcast to the narrowest type covering their range,
+    floats become float32 only when every value converts exactly, and
+    text columns with at most category_ratio distinct values per row
+    become categoricals when that measures smaller. Returns (df, report) where report gives the
+    memory use before and after and each converted column.
+    """
+    before = after = 0
+    converted = {}
+    narrowed = {}
+    for col in df.columns:
+        size = column_bytes(df[col])
+        before += size
+        series = _narrow_column(df[col], category_ratio)
+        # Categories of long unique-ish strings can outweigh the column they replace
+        narrowed_size = None if series is None else column_bytes(series)
+        if series is None or narrowed_size >= size:
+            after += size
+            continue
+        narrowed[col] = series
+        converted[str(col)] = {"from": str(df[col].dtype), "to": str(series.dtype)}
+        after += narrowed_size
+    if narrowed:
+        df = df.copy(deep=False)
+        for col, series in narrowed.items():
+            df[col] = series
+    report = {
+        "bytes_before": before,
+        "bytes_after": after,
+        "saved_ratio": round(1 - after / before, 4) if before else 0.0,
+        "converted": converted
+    }
+    return df, report
+
+
+class QuantileSketch:
+    """Mergeable compactor sketch for approximate quantiles.
+
+    Values are kept in levels where an item at level h stands for 2**h
+    inputs. A level that grows past `size` items is sorted and every other
+    item is promoted to the next level, so memory stays O(size * log n).
+    While nothing has been compacted the sketch holds every value and the
+    answers are exact.
+    """
+
+    def __init__(self, size=QUANTILE_SKETCH_SIZE, seed=0):
+        self.size = size
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        self.count += values.size
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compact()
+
+    def _compact(self):
+        h = 0
+        while h < len(self.levels):
+            if self.levels[h].size > self.size:
+                level = np.sort(self.levels[h])
+                promoted = level[self._rng.integers(2)::2]
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                self.levels[h] = np.empty(0)
+            h += 1
+
+    @property
+    def exact(self):
+        return len(self.levels) == 1
+
+    def quantile(self, q):
+        if self.count == 0:
+            return float('nan')
+        if self.exact:
+            return float(np.quantile(self.levels[0], q))
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(level.size, 2 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        idx = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        return float(values[order][min(idx, len(values) - 1)])
+
+    def median(self):
+        return self.quantile(0.5)
+
+
+class FrequencySketch:
+    """Misra-Gries heavy-hitters sketch used to estimate the mode.
+
+    Keeps at most `size` counters. Counts are exact while a column has no
+    more than `size` distinct values; past that the most frequent values
+    are still guaranteed to be tracked.
+    """
+
+    def __init__(self, size=FREQUENCY_SKETCH_SIZE):
+        self.size = size
+        self.counters = pd.Series(dtype='int64')
+        self.smallest = None
+
+    def update(self, values):
+        counts = pd.Series(values).value_counts(dropna=True)
+        if counts.empty:
+            return
+        smallest = counts.index.min()
+        self.smallest = smallest if self.smallest is None else min(self.smallest, smallest)
+        counters = counts if self.counters.empty else self.counters.add(counts, fill_value=0)
+        if len(counters) > self.size:
+            # Subtract the (size+1)-th largest count and drop what falls to zero
+            cut = counters.nlargest(self.size + 1).iloc[-1]
+            counters = counters[counters > cut] - cut
+        self.counters = counters.astype('int64')
+
+    def mode(self):
+        if self.counters.empty:
+            # Every counter cancelled out, so no value stands out; Series.mode()
+            # returns all values then and the summary takes the smallest
+            return self.smallest
+        # Ties resolve to the smallest value, like Series.mode()
+        best = self.counters.max()
+        return self.counters.index[self.counters.to_numpy() == best].min()
+
+
+class ColumnAccumulator:
+    """Running statistics for one numeric column"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float('nan')
+        self.max = float('nan')
+        self.quantiles = QuantileSketch()
+        self.frequencies = FrequencySketch()
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        valid = values[~np.isnan(values)]
+        n_b = valid.size
+        if n_b:
+            # Chan et al. merge of the chunk moments into the running Welford state
+            mean_b = float(valid.mean())
+            m2_b = float(((valid - mean_b) ** 2).sum())
+            n = self.count + n_b
+            delta = mean_b - self.mean
+            self.mean += delta * n_b / n
+            self.m2 += m2_b + delta * delta * self.count * n_b / n
+            self.count = n
+            self.min = float(np.fmin(self.min, valid.min()))
+            self.max = float(np.fmax(self.max, valid.max()))
+        self.quantiles.update(valid)
+        self.frequencies.update(valid)
+
+    def histogram(self, resolutions=HISTOGRAM_RESOLUTIONS):
+        """Equal-width histogram over the exact range, binned from the quantile sketch.
+
+        Each sketch item is counted with the weight it stands for, so the
+        counts are exact until the sketch first compacts and estimates
+        (summing to the row count) after that.
+        """
+        values = np.concatenate(self.quantiles.levels)
+        weights = np.concatenate([np.full(level.size, 2 ** h) for h, level in enumerate(self.quantiles.levels)])
+        finite = np.isfinite(values)
+        if not finite.any():
+            low, high = 0.0, 1.0
+        else:
+            # The running min and max are exact unless they are infinite
+            low = self.min if np.isfinite(self.min) else values[finite].min()
+            high = self.max if np.isfinite(self.max) else values[finite].max()
+        low, high = _histogram_range(low, high)
+        finest = max(resolutions)
+        counts, _ = np.histogram(values[finite], bins=finest, range=(low, high), weights=weights[finite])
+        if not self.quantiles.exact and counts.sum() > 0:
+            counts = counts * (self.count / counts.sum())
+        return _histogram(low, high, np.rint(counts).astype(np.int64), resolutions, approximate=not self.quantiles.exact)
+
+
+class StreamingSummary:
+    """Builds the /upload summary from DataFrame chunks in one pass.
+
+    A column counts as numeric only if it was numeric in every chunk, which
+    matches how a single read_csv over the whole file would type it.
+    """
+
+    _NUMERIC = {'int8', 'uint8', 'int16', 'uint16', 'int32', 'uint32', 'int64', 'uint64',
+                'float16', 'float32', 'float64'}
+
+    def __init__(self):
+        self.columns = None
+        self.dtypes = {}
+        self.row_count = 0
+        self.accumulators = {}
+        self.csv_options = None
+
+    def update(self, chunk):
+        if self.columns is None:
+            self.columns = chunk.columns.tolist()
+            self.accumulators = {
+                col: ColumnAccumulator()
+                for col in chunk.select_dtypes(include=[np.number]).columns
+            }
+        self.row_count += len(chunk)
+
+        for col in list(self.accumulators):
+            if not pd.api.types.is_numeric_dtype(chunk[col].dtype) or pd.api.types.is_bool_dtype(chunk[col].dtype):
+                del self.accumulators[col]
+                continue
+            self.accumulators[col].update(chunk[col].to_numpy(dtype=float, na_value=np.nan))
+
+        for col, dtype in chunk.dtypes.items():
+            self.dtypes[col] = self._merge_dtype(self.dtypes.get(col), dtype)
+
+    @staticmethod
+    def _merge_dtype(previous, dtype):
+        """Combine the dtype seen so far with the dtype of a new chunk"""
+        if previous is None or previous == str(dtype):
+            return str(dtype)
+        if previous in StreamingSummary._NUMERIC and dtype.kind in 'iuf':
+            # e.g. an int column that met a missing value in a later chunk
+            return str(np.result_type(np.dtype(previous), dtype))
+        return 'object'
+
+    @property
+    def numeric_columns(self):
+        return [col for col in (self.columns or []) if col in self.accumulators]
+
+    def histograms(self, resolutions=HISTOGRAM_RESOLUTIONS):
+        return {col: self.accumulators[col].histogram(resolutions) for col in self.numeric_columns}
+
+    def schema(self):
+        return {
+            "columns": self.columns or [],
+            "dtypes": self.dtypes,
+            "numeric_columns": self.numeric_columns,
+            "row_count": self.row_count
+        }
+
+    def summary(self):
+        summary = {
+            "columns": self.columns or [],
+            "row_count": self.row_count,
+            "mean_values": {},
+            "median_values": {},
+            "mode_values": {},
+            "max_values": {},
+            "min_values": {},
+            "numeric_columns": self.numeric_columns
+        }
+        for col in self.numeric_columns:
+            acc = self.accumulators[col]
+            summary["mean_values"][col] = acc.mean if acc.count else float('nan')
+            summary["median_values"][col] = acc.quantiles.median()
+            summary["max_values"][col] = acc.max
+            summary["min_values"][col] = acc.min
+            mode = acc.frequencies.mode()
+            summary["mode_values"][col] = float(mode) if mode is not None else None
+        return summary
+
+
+def _histogram_range(low, high):
+    """Binning range for values spanning low..high; a single value gets a unit-wide range"""
+    if low == high:
+        return low - 0.5, high + 0.5
+    return low, high
+
+
+def _histogram(low, high, counts, resolutions, approximate=False):
+    """Histogram record with the finest counts summed into every coarser resolution"""
+    finest = len(counts)
+    return {
+        "low": float(low),
+        "high": float(high),
+        "approximate": approximate,
+        "counts": {bins: counts.reshape(bins, finest // bins).sum(axis=1).tolist() for bins in resolutions}
+    }
+
+
+def numeric_histograms(block, minimum, maximum, resolutions=HISTOGRAM_RESOLUTIONS):
+    """Equal-width histograms of every column of a 2-D block at several resolutions.
+
+    All columns are binned together in one pass at the finest resolution
+    (a single bincount over bin numbers offset by column) and each
+    coarser resolution sums adjacent bins, so every resolution must
+    divide the finest. minimum and maximum are the column ranges already
+    computed for the summary; NaN and infinite values are not counted.
+    Returns one record per column with its range and counts per resolution.
+    """
+    n, m = block.shape
+    finest = max(resolutions)
+    low = np.array(minimum, dtype=float)
+    high = np.array(maximum, dtype=float)
+    for j in np.flatnonzero(~(np.isfinite(low) & np.isfinite(high))):
+        column = block[:, j][np.isfinite(block[:, j])]
+        low[j], high[j] = (column.min(), column.max()) if column.size else (0.0, 1.0)
+    for j in range(m):
+        low[j], high[j] = _histogram_range(low[j], high[j])
+
+    valid = np.isfinite(block)
+    with np.errstate(invalid='ignore', over='ignore'):
+        bins = ((block - low) * (finest / (high - low))).astype(np.intp)
+    np.clip(bins, 0, finest - 1, out=bins)
+    bins += np.arange(m) * finest
+    counts = np.bincount(bins[valid], minlength=m * finest).reshape(m, finest)
+    return [_histogram(low[j], high[j], counts[j], resolutions) for j in range(m)]
+
+
+def _sorted_block_stats(block):
+    """Median, mode, min and max of every column from one sort along axis 0"""
+    n, m = block.shape
+    cols = np.arange(m)
+    valid = n - np.isnan(block).sum(axis=0)
+    has_values = valid > 0
+
+    # np.sort keeps the Fortran layout and puts NaN last, so column j's
+    # values occupy ordered[:valid[j], j]
+    ordered = np.sort(block, axis=0)
+    lo = np.maximum((valid - 1) // 2, 0)
+    hi = np.maximum(valid // 2, 0)
+    median = np.where(has_values, (ordered[lo, cols] + ordered[hi, cols]) / 2, np.nan)
+    minimum = np.where(has_values, ordered[0, cols], np.nan)
+    maximum = np.where(has_values, ordered[np.maximum(valid - 1, 0), cols], np.nan)
+
+    # Run-length encode every column in one flat pass (columns are contiguous)
+    flat = ordered.T.ravel()
+    starts = np.ones(flat.size, dtype=bool)
+    starts[1:] = flat[1:] != flat[:-1]
+    starts[::n] = True
+    run_start = np.flatnonzero(starts)
+    run_len = np.diff(np.append(run_start, flat.size))
+    run_col = run_start // n
+    keep = (run_start % n) < valid[run_col]
+    run_start, run_len, run_col = run_start[keep], run_len[keep], run_col[keep]
+
+    best = np.zeros(m, dtype=np.int64)
+    np.maximum.at(best, run_col, run_len)
+    first = np.full(m, -1)
+    # Assign in reverse so the earliest (smallest) run of maximal length wins
+    winners = np.flatnonzero(run_len == best[run_col])[::-1]
+    first[run_col[winners]] = run_start[winners]
+    mode = np.where(first >= 0, flat[np.maximum(first, 0)], np.nan)
+
+    return median, mode, minimum, maximum
+
+
+def numeric_block_stats(block, sample_rows=None, seed=0):
+    """Compute mean, median, mode, min and max for every column of a 2-D block.
+
+    NaN marks missing values and is ignored like in pandas. The mean is
+    always exact. Median and mode (the most frequent value, smallest on
+    ties) come from one sort of the whole block, or, when sample_rows is
+    given and the block is larger, from a sorted uniform row sample while
+    min and max stay exact.
+    """
+    block = np.asfortranarray(block, dtype=float)
+    n, m = block.shape
+    if n == 0:
+        nan = np.full(m, np.nan)
+        return {"mean": nan, "median": nan, "mode": nan, "min": nan, "max": nan}
+
+    missing = np.isnan(block)
+    valid = n - missing.sum(axis=0)
+    totals = np.where(missing, 0.0, block).sum(axis=0) if missing.any() else block.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = totals / valid
+
+    if sample_rows and n > sample_rows:
+        rows = np.sort(np.random.default_rng(seed).choice(n, sample_rows, replace=False))
+        median, mode, _, _ = _sorted_block_stats(np.asfortranarray(block[rows]))
+        # fmin/fmax skip NaN without copying the block
+        minimum = np.fmin.reduce(block, axis=0)
+        maximum = np.fmax.reduce(block, axis=0)
+    else:
+        median, mode, minimum, maximum = _sorted_block_stats(block)
+
+    return {"mean": mean, "median": median, "mode": mode, "min": minimum, "max": maximum}
+
+
+def frame_histograms(df, resolutions=HISTOGRAM_RESOLUTIONS):
+    """numeric_histograms of every numeric column of df, keyed by column"""
+    numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
+    if not numeric_columns:
+        return {}
+    block = df[numeric_columns].to_numpy(dtype=float, na_value=np.nan)
+    histograms = numeric_histograms(block, np.fmin.reduce(block, axis=0), np.fmax.reduce(block, axis=0), resolutions)
+    return dict(zip(numeric_columns, histograms))
+
+
+def summarize_frame(df, approximate=False, sample_rows=APPROX_SAMPLE_ROWS, histogram_resolutions=None):
+    """Build the /upload summary for a parsed frame.
+
+    All numeric columns are summarized together from one 2-D block. With
+    approximate=True the median and mode are estimated from a sample of
+    sample_rows rows, which avoids sorting multi-million-row columns.
+    With histogram_resolutions the summary also gets "histograms", the
+    numeric_histograms of the same block keyed by column.
+    """
+    numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
+    summary = {
+        "columns": df.columns.tolist(),
+        "row_count": len(df),
+        "mean_values": {},
+        "median_values": {},
+        "mode_values": {},
+        "max_values": {},
+        "min_values": {},
+        "numeric_columns": numeric_columns
+    }
+    if histogram_resolutions:
+        summary["histograms"] = {}
+    if not numeric_columns:
+        return summary
+
+    block = df[numeric_columns].to_numpy(dtype=float, na_value=np.nan)
+    stats = numeric_block_stats(block, sample_rows=sample_rows if approximate else None)
+    for i, col in enumerate(numeric_columns):
+        summary["mean_values"][col] = float(stats["mean"][i])
+        summary["median_values"][col] = float(stats["median"][i])
+        summary["max_values"][col] = float(stats["max"][i])
+        summary["min_values"][col] = float(stats["min"][i])
+        mode = stats["mode"][i]
+        summary["mode_values"][col] = None if np.isnan(mode) else float(mode)
+    if histogram_resolutions:
+        histograms = numeric_histograms(block, stats["min"], stats["max"], histogram_resolutions)
+        summary["histograms"] = dict(zip(numeric_columns, histograms))
+    return summary
+
+
+def _summarize_chunks(file_path, chunk_rows, options, on_chunk):
+    summary = StreamingSummary()
+    with open(file_path, 'rb') as f:
+        for chunk in pd.read_csv(f, chunksize=chunk_rows, **options):
+            summary.update(chunk)
+            if on_chunk:
+                # The parser reads ahead, so the offset runs at most one buffer early
+                on_chunk(summary.row_count, f.tell())
+    return summary
+
+
+def summarize_csv_streaming(file_path, chunk_rows=DEFAULT_CHUNK_ROWS, options=None, on_chunk=None):
+    """Summarize a CSV in fixed-size chunks without holding the whole file.
+
+    on_chunk, if given, is called with the number of rows and bytes read
+    so far after every chunk.
+    """
+    options = options or sniff_csv(file_path)
+    try:
+        summary = _summarize_chunks(file_path, chunk_rows, options, on_chunk)
+    except UnicodeDecodeError as e:
+        logger.warning(f"{file_path} is not {options['encoding']} past the sniffed prefix ({e}), using latin-1")
+        options = dict(options, encoding='latin-1')
+        summary = _summarize_chunks(file_path, chunk_rows, options, on_chunk)
+    summary.csv_options = options
+    return summary
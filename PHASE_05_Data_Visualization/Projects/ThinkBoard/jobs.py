@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+ThinkBoard - Background Jobs
+Bounded worker pool for uploads processed off the request thread
+"""
+
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while every queue slot is taken"""
+
+
+class Job:
+    """A unit of background work and the progress it has reported"""
+
+    def __init__(self, kind):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.status = 'queued'
+        self.stage = None
+        self.progress = 0.0
+        self.details = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def report(self, stage, progress=None, **details):
+        """Record the current stage, an optional 0-1 fraction and any counters"""
+        self.stage = stage
+        if progress is not None:
+            self.progress = progress
+        self.details.update(details)
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 4),
+            "details": self.details,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class JobQueue:
+    """Runs submitted jobs on a fixed number of worker threads.
+
+    At most max_pending jobs wait for a worker; submitting beyond that
+    raises JobQueueFull so callers can push back instead of piling up
+    work. A job function is called as func(job, *args) and returns
+    (payload, status_code); status codes of 400 and above mark the job
+    failed with payload["error"]. Workers start on the first submit and
+    only the most recent keep_finished finished jobs are remembered.
+    """
+
+    def __init__(self, workers=2, max_pending=16, keep_finished=1000):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"thinkboard-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, kind, func, *args):
+        """Queue func(job, *args) and return the job; raises JobQueueFull"""
+        self._start()
+        job = Job(kind)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        try:
+            self._queue.put_nowait((job, func, args))
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.job_id]
+                self.rejected += 1
+            raise JobQueueFull(f"Job queue is full ({self.max_pending} pending)")
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _work(self):
+        while True:
+            job, func, args = self._queue.get()
+            job.status = 'running'
+            job.started_at = time.time()
+            try:
+                payload, status = func(job, *args)
+                if status >= 400:
+                    job.error = payload.get("error")
+                    job.status = 'failed'
+                else:
+                    job.result = payload
+                    job.progress = 1.0
+                    job.status = 'done'
+            except Exception as e:
+                logger.error(f"Job {job.job_id} ({job.kind}) failed: {e}")
+                job.error = str(e)
+                job.status = 'failed'
+            finally:
+                job.finished_at = time.time()
+                self._finish(job)
+                self._queue.task_done()
+
+    def _finish(self, job):
+        with self._lock:
+            if job.status == 'failed':
+                self.failed += 1
+            else:
+                self.completed += 1
+            finished = [job_id for job_id, j in self._jobs.items() if j.finished]
+            for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+                del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.status == 'running')
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._queue.qsize(),
+                "running": running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected
+            }
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+ThinkBoard - Lazy Imports
+Module stand-ins that import heavy dependencies on first use
+"""
+
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Placeholder for a module that is imported the first time it is used.
+
+    The first attribute lookup that misses imports the real module and
+    copies its namespace onto the placeholder, so later lookups cost the
+    same as on the module itself. Concurrent first uses are serialized by
+    the import system's per-module lock, unlike importlib.util.LazyLoader
+    which is not thread-safe before Python 3.12.
+    """
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name):
+    """The module called name, or a LazyModule if it is not imported yet"""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def preload(*names):
+    """Import modules now, e.g. from a background thread after startup"""
+    for name in names:
+        importlib.import_module(name)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+ThinkBoard - Process Offload
+Runs CPU-bound pandas work in worker processes, outside the server's GIL
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from cache import DataFrameCache
+from columnar import ColumnarStore, read_csv_frame
+from ingest import HISTOGRAM_RESOLUTIONS, optimize_dtypes, read_csv_once, summarize_frame, validate_dataframe
+from lazy import lazy_import
+from queries import aggregate_frame, contains_positions, sorted_positions
+
+np = lazy_import('numpy')
+
+# Per-process state, set up by _init_worker in each pool process
+_worker_cache = None
+_worker_store = None
+_worker_prepare = None
+
+
+def _optimized(df):
+    return optimize_dtypes(df)[0]
+
+
+def _init_worker(cache_bytes, use_columnar, optimize=False):
+    global _worker_cache, _worker_store, _worker_prepare
+    _worker_cache = DataFrameCache(cache_bytes)
+    _worker_store = ColumnarStore() if use_columnar else None
+    _worker_prepare = _optimized if optimize else None
+
+
+def _frame(path, csv_options):
+    return _worker_cache.get(path, loader=lambda p: read_csv_frame(p, _worker_store, _worker_prepare, **csv_options))
+
+
+def _compact(positions, n):
+    return positions.astype(np.int32 if n < 2 ** 31 else np.int64, copy=False)
+
+
+def sort_positions_task(path, csv_options, column, ascending, k=None):
+    """Worker side of sorted_positions; only the positions are sent back"""
+    series = _frame(path, csv_options)[column]
+    return _compact(sorted_positions(series, ascending, k), len(series))
+
+
+def search_positions_task(path, csv_options, column, query):
+    """Worker side of the case-insensitive substring scan used by /search"""
+    series = _frame(path, csv_options)[column]
+    return _compact(contains_positions(series, query), len(series))
+
+
+def aggregate_task(path, csv_options, group_by, aggregations):
+    """Worker side of aggregate_frame; only the grouped rows are sent back"""
+    return aggregate_frame(_frame(path, csv_options), group_by, aggregations)
+
+
+def ingest_task(path, approximate_rows):
+    """Parse an upload, write its columnar copy and summarize it.
+
+    Returns (schema, csv_options, summary, validation_message, memory);
+    the frame itself stays in the worker, the server reads it back
+    memory-mapped. memory is the optimize_dtypes report, or None, and
+    the summary carries the column histograms under "histograms".
+    """
+    df, csv_options = read_csv_once(path)
+    is_valid, message = validate_dataframe(df)
+    memory = None
+    if _worker_prepare is not None:
+        df, memory = optimize_dtypes(df)
+    if _worker_store is not None:
+        _worker_store.write(path, df)
+    _worker_cache.put(path, df)
+    schema = {
+        "columns": df.columns.tolist(),
+        "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
+        "numeric_columns": df.select_dtypes(include=[np.number]).columns.tolist(),
+        "row_count": len(df)
+    }
+    summary = summarize_frame(df, approximate=len(df) > approximate_rows, histogram_resolutions=HISTOGRAM_RESOLUTIONS)
+    return schema, csv_options, summary, None if is_valid else message, memory
+
+
+class ProcessOffload:
+    """Pool of worker processes for CPU-bound request work.
+
+    Threads serving requests block on run() while a worker process does
+    the work, so parsing, sorting and scanning no longer hold the
+    server's GIL and a heavy request does not stall light ones. Only
+    file paths and small arguments go to the workers and only compact
+    results (row positions, summaries) come back; each worker loads
+    frames through its own cache, from the memory-mapped columnar copy
+    when one exists. Workers are spawned on first use.
+    """
+
+    def __init__(self, processes, cache_bytes, use_columnar=True, optimize_dtypes=False):
+        self.processes = processes
+        self.cache_bytes = cache_bytes
+        self.use_columnar = use_columnar
+        self.optimize_dtypes = optimize_dtypes
+        self._executor = None
+        self._lock = threading.Lock()
+        self.tasks = 0
+        self.restarts = 0
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.cache_bytes, self.use_columnar, self.optimize_dtypes)
+                )
+            self.tasks += 1
+            return self._executor
+
+    def run(self, func, *args):
+        """Run func(*args) in a worker process and return its result"""
+        executor = self._pool()
+        try:
+            return executor.submit(func, *args).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool and retry once
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+                    self.restarts += 1
+            executor.shutdown(wait=False)
+            return self._pool().submit(func, *args).result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "processes": self.processes,
+                "started": self._executor is not None,
+                "tasks": self.tasks,
+                "restarts": self.restarts
+            }
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+ThinkBoard - Request Profiling
+Per-request stage timings, optional cProfile capture and a slow-request log
+"""
+
+import cProfile
+import io
+import json
+import logging
+import pstats
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger('thinkboard.slow_requests')
+
+PROFILING_MODES = ('off', 'stages', 'cprofile')
+
+_current = ContextVar('thinkboard_request_profile', default=None)
+
+
+class RequestProfile:
+    """Stage timings, and optionally a cProfile run, for one request"""
+
+    def __init__(self, cprofile=False):
+        self.started = time.perf_counter()
+        self.duration = None
+        self.stages = {}
+        self.profiler = None
+        if cprofile:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                self.profiler = profiler
+            except ValueError:
+                # Another profiler is already active on this interpreter
+                logger.debug("cProfile unavailable for this request")
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def finish(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self.started
+            if self.profiler is not None:
+                self.profiler.disable()
+        return self.duration
+
+    def server_timing(self):
+        """Stages formatted for the Server-Timing response header"""
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        parts.append(f"total;dur={(self.duration or 0) * 1000:.1f}")
+        return ', '.join(parts)
+
+    def top(self, limit=25):
+        """The slowest functions by cumulative time, as text"""
+        if self.profiler is None:
+            return None
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+
+def begin_profile(cprofile=False):
+    """Start profiling the work done in the current context"""
+    profile = RequestProfile(cprofile)
+    _current.set(profile)
+    return profile
+
+
+def current_profile():
+    return _current.get()
+
+
+def end_profile():
+    """Stop attributing stages to the profile begun in this context"""
+    profile = _current.get()
+    _current.set(None)
+    if profile is not None:
+        profile.finish()
+    return profile
+
+
+@contextmanager
+def stage(name):
+    """Time a block as a named stage of the current request, if it is profiled"""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - started)
+
+
+def configure_slow_log(path=None):
+    """Send slow-request records to path as JSON lines, or to the app log"""
+    if path:
+        handler = logging.FileHandler(path)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        slow_logger.addHandler(handler)
+        slow_logger.propagate = False
+    return slow_logger
+
+
+def log_slow_request(profile, method, path, status, top_n=25):
+    record = {
+        "time": time.time(),
+        "method": method,
+        "path": path,
+        "status": status,
+        "duration_ms": round(profile.duration * 1000, 1),
+        "stages_ms": {name: round(seconds * 1000, 1) for name, seconds in profile.stages.items()},
+        "profile": profile.top(top_n)
+    }
+    slow_logger.warning(json.dumps(record))
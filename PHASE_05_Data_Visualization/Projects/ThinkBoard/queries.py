@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+ThinkBoard - Query Execution
+Sorting, scanning, grouping and pagination helpers for the analysis endpoints
+"""
+
+import base64
+import json
+
+from lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+AGGREGATIONS = ('count', 'sum', 'mean', 'median', 'min', 'max', 'std', 'nunique')
+NUMERIC_AGGREGATIONS = ('sum', 'mean', 'median', 'std')
+
+
+def sort_key(series):
+    """Return a float array that orders like series, with NaN for missing values"""
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        return series.to_numpy(dtype=float, na_value=np.nan)
+    # Rank text (and booleans) through their sorted distinct values
+    codes, _ = pd.factorize(series, sort=True)
+    key = codes.astype(float)
+    key[codes < 0] = np.nan
+    return key
+
+
+def contains_positions(series, query):
+    """Row positions whose value contains query, ignoring case.
+
+    Categorical columns are matched on their distinct values and the
+    matching codes selected, instead of testing every row's string.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = pd.Series(series.cat.categories.astype(str))
+        matched = np.flatnonzero(categories.str.contains(query, case=False, na=False).to_numpy())
+        # Missing values have code -1; match them as the scan's astype(str) renders them
+        missing = pd.Series([np.nan], dtype=object).astype(str)
+        if missing.str.contains(query, case=False, na=False).iloc[0]:
+            matched = np.append(matched, -1)
+        return np.flatnonzero(np.isin(series.cat.codes.to_numpy(), matched))
+    matches = series.astype(str).str.contains(query, case=False, na=False)
+    return np.flatnonzero(matches.to_numpy())
+
+
+def sorted_positions(series, ascending=True, k=None):
+    """Row positions of series in sort order.
+
+    Missing values go last and ties keep their original row order, so
+    pages cut from the result are consistent with each other. When k is
+    given only the first k positions are returned, found by partial
+    selection in O(n + k log k) instead of a full O(n log n) sort.
+    """
+    key = sort_key(series)
+    if not ascending:
+        key = -key
+    missing = np.isnan(key)
+    n = len(key)
+
+    if k is None or k >= n:
+        return np.lexsort((key, missing))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    present = np.flatnonzero(~missing)
+    if len(present) <= k:
+        ordered = present[np.argsort(key[present], kind='stable')]
+        return np.concatenate([ordered, np.flatnonzero(missing)[:k - len(present)]])
+
+    values = key[present]
+    threshold = np.partition(values, k - 1)[k - 1]
+    below = present[values < threshold]
+    # Ties at the cut are taken in row order, which keeps the selection stable
+    at_threshold = present[values == threshold][:k - len(below)]
+    candidates = np.concatenate([below, at_threshold])
+    candidates.sort()
+    return candidates[np.argsort(key[candidates], kind='stable')]
+
+
+def parse_aggregations(spec):
+    """Read {"column": "func" or ["func", ...]} into (column, func) pairs; raises ValueError if invalid"""
+    if spec is None:
+        return []
+    if not isinstance(spec, dict):
+        raise ValueError("aggregations must map column names to functions")
+    pairs = []
+    for column, funcs in spec.items():
+        if isinstance(funcs, str):
+            funcs = [funcs]
+        if not isinstance(funcs, list):
+            raise ValueError(f"Functions for '{column}' must be a name or a list of names")
+        for func in funcs:
+            if func not in AGGREGATIONS:
+                raise ValueError(f"Unknown aggregation '{func}'. Use one of {list(AGGREGATIONS)}")
+            if (column, func) not in pairs:
+                pairs.append((column, func))
+    return pairs
+
+
+def aggregate_frame(df, group_by, aggregations):
+    """Group the rows of df by the group_by columns and reduce each group.
+
+    Returns one row per group, ordered by key: the key columns, "count"
+    (rows in the group) and a <column>_<func> column per aggregation.
+    Rows with a missing key form a group of their own. Grouping hashes
+    the keys once (categorical keys reuse their codes) and every
+    aggregation is a vectorized pass over the grouped values; narrowed
+    float32 columns are reduced in float64 and categorized text columns
+    as their strings, since unordered categoricals have no min or max.
+    """
+    values = {}
+    for column, _ in aggregations:
+        if column not in values:
+            series = df[column]
+            if series.dtype == np.float32:
+                series = series.astype(float)
+            elif isinstance(series.dtype, pd.CategoricalDtype):
+                series = series.astype(series.cat.categories.dtype)
+            values[column] = series
+    keys = [df[column] for column in group_by]
+    grouped = pd.DataFrame(values, index=df.index).groupby(keys, sort=True, dropna=False, observed=True)
+    named = {f"{column}_{func}": pd.NamedAgg(column=column, aggfunc=func) for column, func in aggregations}
+    result = grouped.agg(**named) if named else pd.DataFrame(index=grouped.size().index)
+    result.insert(0, 'count', grouped.size())
+    return result.reset_index()
+
+
+def parse_page(data):
+    """Read limit and offset from a request body; raises ValueError if invalid"""
+    limit = data.get('limit')
+    offset = data.get('offset', 0)
+    if limit is not None:
+        limit = int(limit)
+        if limit <= 0:
+            raise ValueError("limit must be a positive integer")
+    offset = int(offset)
+    if offset < 0:
+        raise ValueError("offset must be zero or a positive integer")
+    return limit, offset
+
+
+def encode_cursor(**state):
+    """Encode pagination state as an opaque URL-safe token"""
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a token from encode_cursor; raises ValueError if malformed"""
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
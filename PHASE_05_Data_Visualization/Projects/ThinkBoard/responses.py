@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+ThinkBoard - Responses
+Streaming, column-oriented and binary serialization of row results
+"""
+
+import json
+from importlib.util import find_spec
+
+from flask import Response, jsonify, stream_with_context
+
+from lazy import lazy_import
+
+np = lazy_import('numpy')
+
+# Optional, and only imported once a client asks for them:
+# pip install msgpack for application/msgpack, pyarrow for Arrow IPC
+msgpack = lazy_import('msgpack') if find_spec('msgpack') else None
+pyarrow = lazy_import('pyarrow') if find_spec('pyarrow') else None
+
+STREAM_BATCH_ROWS = 10_000
+NDJSON_MIMETYPE = 'application/x-ndjson'
+COLUMNS_MIMETYPE = 'application/vnd.thinkboard.columns+json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+# Response formats by name, with the media type that selects each one in Accept
+RESPONSE_FORMATS = {
+    'records': 'application/json',
+    'columns': COLUMNS_MIMETYPE,
+    'msgpack': MSGPACK_MIMETYPE,
+    'arrow': ARROW_MIMETYPE
+}
+
+
+def streaming_mode(request, data):
+    """Pick the streaming format a request asked for, or None.
+
+    NDJSON is chosen with an Accept: application/x-ndjson header or
+    "stream": "ndjson" in the body; "stream": true streams a regular JSON
+    array so existing clients can parse the result unchanged.
+    """
+    stream = data.get('stream')
+    if stream == 'ndjson':
+        return 'ndjson'
+    if stream:
+        return 'json'
+    accept = request.accept_mimetypes
+    if accept[NDJSON_MIMETYPE] > accept['application/json']:
+        return 'ndjson'
+    return None
+
+
+def _batches(df, positions, batch_rows):
+    """Yield row batches of df, optionally restricted to positions"""
+    if positions is None:
+        positions = np.arange(len(df))
+    for start in range(0, len(positions), batch_rows):
+        yield df.iloc[positions[start:start + batch_rows]]
+
+
+def iter_ndjson(df, positions=None, batch_rows=STREAM_BATCH_ROWS):
+    """Yield one JSON object per line, serialized a batch at a time"""
+    for batch in _batches(df, positions, batch_rows):
+        yield batch.to_json(orient='records', lines=True).rstrip('\n') + '\n'
+
+
+def iter_json_array(df, positions=None, batch_rows=STREAM_BATCH_ROWS):
+    """Yield a JSON array of records in chunks, a batch at a time"""
+    yield '['
+    first = True
+    for batch in _batches(df, positions, batch_rows):
+        body = batch.to_json(orient='records')[1:-1]
+        if not body:
+            continue
+        yield body if first else ',' + body
+        first = False
+    yield ']'
+
+
+def stream_rows(df, positions=None, mode='json', batch_rows=STREAM_BATCH_ROWS, headers=None):
+    """Build a chunked response that serializes rows lazily"""
+    if mode == 'ndjson':
+        body, mimetype = iter_ndjson(df, positions, batch_rows), NDJSON_MIMETYPE
+    else:
+        body, mimetype = iter_json_array(df, positions, batch_rows), 'application/json'
+    return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
+
+
+def available_formats():
+    """Response formats this server can produce"""
+    formats = ['records', 'columns']
+    if msgpack is not None:
+        formats.append('msgpack')
+    if pyarrow is not None:
+        formats.append('arrow')
+    return formats
+
+
+def response_format(request, data):
+    """Pick the body format a request asked for.
+
+    "format" in the JSON body wins, otherwise the Accept header is
+    negotiated; */* and plain application/json keep the records shape
+    existing clients expect. Raises ValueError for a format that is
+    unknown or whose optional library is not installed.
+    """
+    requested = data.get('format')
+    if requested:
+        if requested not in RESPONSE_FORMATS:
+            raise ValueError(f"Unknown format '{requested}'. Use one of {list(RESPONSE_FORMATS)}")
+        if requested not in available_formats():
+            raise ValueError(f"Format '{requested}' needs the {'pyarrow' if requested == 'arrow' else requested} package")
+        return requested
+    by_mimetype = {RESPONSE_FORMATS[name]: name for name in available_formats()}
+    best = request.accept_mimetypes.best_match(list(by_mimetype))
+    return by_mimetype.get(best, 'records')
+
+
+def column_values(series):
+    """A column as a list, with missing values as None"""
+    values = series.to_numpy()
+    if values.dtype.kind in 'iub':
+        return values.tolist()
+    if values.dtype.kind == 'f':
+        missing = np.isnan(values)
+        if not missing.any():
+            return values.tolist()
+        values = values.astype(object)
+        values[missing] = None
+        return values.tolist()
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def frame_columns(frame):
+    """Column-oriented form of a frame: names once, then one array per column"""
+    return {
+        "columns": [str(col) for col in frame.columns],
+        "values": [column_values(frame[col]) for col in frame.columns]
+    }
+
+
+def _arrow_body(table, meta):
+    if meta:
+        table = table.replace_schema_metadata({b'thinkboard': json.dumps(meta, default=str).encode('utf-8')})
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _encoded(payload, fmt):
+    if fmt == 'msgpack':
+        return Response(msgpack.packb(payload), mimetype=MSGPACK_MIMETYPE)
+    response = jsonify(payload)
+    if fmt == 'columns':
+        response.mimetype = COLUMNS_MIMETYPE
+    return response
+
+
+def rows_response(frame, fmt='records', meta=None):
+    """Serialize result rows in the negotiated format.
+
+    meta (pagination fields) is merged into a JSON or MessagePack object
+    next to "rows"; without it records are a bare array as before. Arrow
+    responses carry meta as JSON in the schema metadata.
+    """
+    if fmt == 'arrow':
+        return Response(_arrow_body(pyarrow.Table.from_pandas(frame, preserve_index=False), meta), mimetype=ARROW_MIMETYPE)
+    rows = frame.to_dict('records') if fmt == 'records' else frame_columns(frame)
+    if meta is None:
+        return _encoded(rows, fmt)
+    return _encoded({"rows": rows, **meta}, fmt)
+
+
+def arrays_response(arrays, fmt='records', meta=None):
+    """Serialize named NumPy arrays (already column-oriented) plus meta fields"""
+    if fmt == 'arrow':
+        return Response(_arrow_body(pyarrow.table(arrays), meta), mimetype=ARROW_MIMETYPE)
+    return _encoded({**(meta or {}), **{name: values.tolist() for name, values in arrays.items()}}, fmt)
@@ -7,17 +7,17 @@ Checks dependencies and starts the application
 import sys
 import subprocess
 import os
+from importlib.util import find_spec
 
 def check_dependencies():
-    """Check if all required packages are installed"""
+    """Check if all required packages are installed, without importing them"""
     required_packages = ['flask', 'flask_cors', 'pandas', 'numpy']
     missing_packages = []
     
     for package in required_packages:
-        try:
-            __import__(package)
+        if find_spec(package) is not None:
             print(f"✅ {package} is installed")
-        except ImportError:
+        else:
             missing_packages.append(package)
             print(f"❌ {package} is missing")
     
@@ -42,9 +42,9 @@ def start_app():
     print("=" * 50)
     
     try:
-        from app import app
+        from app import create_app
         # Use debug=False to avoid watchdog issues with Python 3.13
-        app.run(debug=False, host='127.0.0.1', port=5000)
+        create_app().run(debug=False, host='127.0.0.1', port=5000)
     except KeyboardInterrupt:
         print("\n👋 Thanks for using ThinkBoard!")
     except Exception as e:
@@ -6,6 +6,19 @@ let chartInstance = null;
 let chartType = 'bar';
 let currentFile = null;
 
+// Rows shown in the results table
+const TABLE_PAGE_SIZE = 10;
+// Points requested for line charts; the server downsamples longer series
+const CHART_MAX_POINTS = 1000;
+// Bars per distribution chart; the server precomputes 8, 16, 32, 64 and 128
+const HISTOGRAM_BINS = 32;
+// Larger uploads are processed in the background and polled for
+const ASYNC_UPLOAD_BYTES = 2 * 1024 * 1024;
+const JOB_POLL_INTERVAL_MS = 1000;
+// Recent /sort, /search and /gradient results, revalidated with their ETag
+const RESULT_CACHE_ENTRIES = 20;
+const resultCache = new Map();
+
 // DOM Elements
 const dataChart = document.getElementById('dataChart')?.getContext('2d');
 
@@ -224,6 +237,7 @@ async function uploadCSV() {
     currentFile = file;
     const formData = new FormData();
     formData.append("file", file);
+    if (file.size > ASYNC_UPLOAD_BYTES) formData.append("async", "1");
 
     try {
         const response = await fetch("/upload", {
@@ -231,7 +245,10 @@ async function uploadCSV() {
             body: formData,
         });
         
-        const data = await response.json();
+        let data = await response.json();
+        if (response.status === 202) {
+            data = await waitForJob(data.status_url);
+        }
         
         if (data.error) {
             showNotification(data.error, 'error');
@@ -258,6 +275,18 @@ async function uploadCSV() {
     }
 }
 
+// Poll a background job until it finishes and return its result (or an error object)
+async function waitForJob(statusUrl) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        const response = await fetch(statusUrl);
+        const job = await response.json();
+        if (job.error && !job.status) return job;
+        if (job.status === 'done') return job.result;
+        if (job.status === 'failed') return { error: job.error || 'Processing failed' };
+    }
+}
+
 // Display analytics with modern cards
 function displayAnalytics(summary) {
     const analyticsContainer = document.getElementById("analyticsContainer");
@@ -310,6 +339,12 @@ function displayAnalytics(summary) {
             <button class="btn-secondary" onclick="computeGradient()">
                 <i class="fas fa-chart-line"></i> Compute Gradient
             </button>
+            <button class="btn-secondary" onclick="aggregateData()">
+                <i class="fas fa-layer-group"></i> Group & Aggregate
+            </button>
+            <button class="btn-secondary" onclick="showDistribution()">
+                <i class="fas fa-chart-bar"></i> Show Distribution
+            </button>
         </div>
     `;
 }
@@ -482,6 +517,45 @@ function updateChartType(type) {
     }
 }
 
+// POST a JSON request, reusing the stored result when the server answers 304
+async function postJSON(url, payload) {
+    const body = JSON.stringify(payload);
+    const key = `${url} ${body}`;
+    const cached = resultCache.get(key);
+    const headers = { "Content-Type": "application/json" };
+    if (cached) headers["If-None-Match"] = cached.etag;
+    
+    const response = await fetch(url, { method: "POST", headers, body });
+    if (response.status === 304 && cached) {
+        resultCache.delete(key);
+        resultCache.set(key, cached);
+        return cached.data;
+    }
+    
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (response.ok && etag) {
+        resultCache.delete(key);
+        resultCache.set(key, { etag, data });
+        if (resultCache.size > RESULT_CACHE_ENTRIES) {
+            resultCache.delete(resultCache.keys().next().value);
+        }
+    }
+    return data;
+}
+
+// Row objects from the column-oriented { columns, values } response, up to limit
+function columnsToRows(table, limit = Infinity) {
+    const count = Math.min(table.values[0]?.length ?? 0, limit);
+    const rows = [];
+    for (let i = 0; i < count; i++) {
+        const row = {};
+        table.columns.forEach((name, j) => { row[name] = table.values[j][i]; });
+        rows.push(row);
+    }
+    return rows;
+}
+
 // Enhanced sort function
 async function sortData() {
     if (!currentData || !currentFile) {
@@ -495,20 +569,15 @@ async function sortData() {
     const order = confirm("Sort ascending? Click Cancel for descending.") ? "asc" : "desc";
 
     try {
-        const response = await fetch("/sort", {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ column, order }),
-        });
-        
-        const sortedData = await response.json();
+        // Only the first page is displayed, so only ask for that page, one array per column
+        const sortedData = await postJSON("/sort", { column, order, dataset_id: currentData.dataset_id, limit: TABLE_PAGE_SIZE, format: "columns" });
         
         if (sortedData.error) {
             showNotification(sortedData.error, 'error');
             return;
         }
         
-        displayTable(sortedData, `Sorted by ${column} (${order})`);
+        displayTable(columnsToRows(sortedData.rows), `Sorted by ${column} (${order})`, sortedData.total);
         showNotification('Data sorted successfully!', 'success');
         
     } catch (error) {
@@ -531,21 +600,17 @@ async function searchData() {
     if (!query) return;
 
     try {
-        const response = await fetch("/search", {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ column, query }),
-        });
-        
-        const searchResults = await response.json();
+        const searchResults = await postJSON("/search", { column, query, dataset_id: currentData.dataset_id, format: "columns" });
         
         if (searchResults.error) {
             showNotification(searchResults.error, 'error');
             return;
         }
         
-        displayTable(searchResults, `Search Results for "${query}" in ${column}`);
-        showNotification(`Found ${searchResults.length} results!`, 'success');
+        // Only the displayed rows are turned into objects
+        const found = searchResults.values[0]?.length ?? 0;
+        displayTable(columnsToRows(searchResults, TABLE_PAGE_SIZE), `Search Results for "${query}" in ${column}`, found);
+        showNotification(`Found ${found} results!`, 'success');
         
     } catch (error) {
         console.error("Error searching data:", error);
@@ -564,20 +629,14 @@ async function computeGradient() {
     if (!column) return;
 
     try {
-        const response = await fetch("/gradient", {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ column }),
-        });
-        
-        const gradientData = await response.json();
+        const gradientData = await postJSON("/gradient", { column, dataset_id: currentData.dataset_id, max_points: CHART_MAX_POINTS });
         
         if (gradientData.error) {
             showNotification(gradientData.error, 'error');
             return;
         }
         
-        renderGradientChart(gradientData.gradients, column);
+        renderGradientChart(gradientData.gradients, column, gradientData.positions);
         showNotification('Gradient computed successfully!', 'success');
         
     } catch (error) {
@@ -586,8 +645,67 @@ async function computeGradient() {
     }
 }
 
+// Group-by aggregation, computed on the server so only one row per group is sent
+async function aggregateData() {
+    if (!currentData || !currentFile) {
+        showNotification('Please upload a CSV file first.', 'error');
+        return;
+    }
+    
+    const groupBy = prompt("Enter the column to group by:");
+    if (!groupBy) return;
+    
+    const column = prompt("Enter the numeric column to aggregate (leave empty to count rows):");
+    const func = column ? (prompt("Aggregation (sum, mean, median, min, max, std):", "sum") || "sum") : null;
+
+    try {
+        const aggregations = column ? { [column]: func } : {};
+        const result = await postJSON("/aggregate", { group_by: groupBy, aggregations, dataset_id: currentData.dataset_id, format: "columns" });
+        
+        if (result.error) {
+            showNotification(result.error, 'error');
+            return;
+        }
+        
+        const title = column ? `${func} of ${column} by ${groupBy}` : `Rows per ${groupBy}`;
+        displayTable(columnsToRows(result.rows, TABLE_PAGE_SIZE), title, result.groups);
+        showNotification(`Aggregated ${result.row_count} rows into ${result.groups} groups!`, 'success');
+        
+    } catch (error) {
+        console.error("Error aggregating data:", error);
+        showNotification('Error aggregating data. Please try again.', 'error');
+    }
+}
+
+// Distribution of a numeric column from the histograms built at upload time
+async function showDistribution() {
+    if (!currentData || !currentFile) {
+        showNotification('Please upload a CSV file first.', 'error');
+        return;
+    }
+    
+    const column = prompt("Enter the numeric column to show the distribution of:");
+    if (!column) return;
+
+    try {
+        const result = await postJSON("/histogram", { column, bins: HISTOGRAM_BINS, dataset_id: currentData.dataset_id });
+        
+        if (result.error) {
+            showNotification(result.error, 'error');
+            return;
+        }
+        
+        renderHistogramChart(result.histograms[column], column);
+        showNotification(`Distribution of ${result.row_count} rows shown!`, 'success');
+        
+    } catch (error) {
+        console.error("Error loading histogram:", error);
+        showNotification('Error loading distribution. Please try again.', 'error');
+    }
+}
+
 // Enhanced table display
-function displayTable(data, title) {
+function displayTable(data, title, total = data?.length) {
     const resultsTable = document.getElementById('resultsTable');
     if (!resultsTable) return;
     
@@ -613,7 +731,7 @@ function displayTable(data, title) {
                         </tr>
                     </thead>
                     <tbody>
-                        ${data.slice(0, 10).map(row => `
+                        ${data.slice(0, TABLE_PAGE_SIZE).map(row => `
                             <tr class="hover:bg-white hover:bg-opacity-10 transition-colors duration-200">
                                 ${headers.map(header => `<td class="text-secondary">${row[header]}</td>`).join('')}
                             </tr>
@@ -621,14 +739,14 @@ function displayTable(data, title) {
                     </tbody>
                 </table>
             </div>
-            <p class="text-sm text-muted mt-4 text-center">Showing up to 10 rows of ${data.length} total results.</p>
+            <p class="text-sm text-muted mt-4 text-center">Showing up to ${TABLE_PAGE_SIZE} rows of ${total} total results.</p>
         </div>
     `;
     resultsTable.innerHTML = tableHTML;
 }
 
 // Enhanced gradient chart
-function renderGradientChart(gradients, column) {
+function renderGradientChart(gradients, column, positions = null) {
     if (!dataChart) return;
     
     if (chartInstance) {
@@ -638,7 +756,7 @@ function renderGradientChart(gradients, column) {
     chartInstance = new Chart(dataChart, {
         type: 'line',
         data: {
-            labels: Array.from({ length: gradients.length }, (_, i) => i + 1),
+            labels: positions ? positions.map(i => i + 1) : Array.from({ length: gradients.length }, (_, i) => i + 1),
             datasets: [{
                 label: `Gradient of ${column}`,
                 data: gradients,
@@ -650,7 +768,8 @@ function renderGradientChart(gradients, column) {
                 pointBackgroundColor: 'rgba(220, 38, 38, 1)',
                 pointBorderColor: '#ffffff',
                 pointBorderWidth: 2,
-                pointRadius: 6,
+                // Markers on hundreds of points only add drawing time
+                pointRadius: gradients.length > 100 ? 0 : 6,
                 pointHoverRadius: 8
             }]
         },
@@ -733,6 +852,55 @@ function renderGradientChart(gradients, column) {
     });
 }
 
+// Histogram chart, one bar per bin labelled with its lower edge
+function renderHistogramChart(histogram, column) {
+    if (!dataChart) return;
+    
+    if (chartInstance) {
+        chartInstance.destroy();
+    }
+
+    const axis = (text) => ({
+        title: { display: true, text, color: '#ffffff', font: { size: 14, weight: '600' } },
+        ticks: { color: '#ffffff', font: { size: 12, weight: '500' } },
+        grid: { color: 'rgba(255, 255, 255, 0.15)', lineWidth: 1 }
+    });
+
+    chartInstance = new Chart(dataChart, {
+        type: 'bar',
+        data: {
+            labels: histogram.edges.slice(0, -1).map(edge => Number(edge.toPrecision(4))),
+            datasets: [{
+                label: histogram.approximate ? `${column} (estimated)` : column,
+                data: histogram.counts,
+                backgroundColor: 'rgba(234, 88, 12, 0.8)',
+                borderColor: 'rgba(234, 88, 12, 1)',
+                borderWidth: 1,
+                barPercentage: 1.0,
+                categoryPercentage: 1.0
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: { position: 'top', labels: { color: '#ffffff', font: { size: 14, weight: '600' }, padding: 15 } },
+                title: {
+                    display: true,
+                    text: `Distribution of ${column}`,
+                    color: '#ffffff',
+                    font: { size: 18, weight: 'bold' },
+                    padding: { top: 10, bottom: 20 }
+                }
+            },
+            scales: {
+                y: axis('Rows'),
+                x: axis(column)
+            }
+        }
+    });
+}
+
 // Enhanced notification system
 function showNotification(message, type = 'info') {
     const notification = document.createElement('div');
@@ -780,4 +948,6 @@ window.updateChartType = updateChartType;
 window.sortData = sortData;
 window.searchData = searchData;
 window.computeGradient = computeGradient;
+window.aggregateData = aggregateData;
+window.showDistribution = showDistribution;
 window.scrollToAnalytics = scrollToAnalytics; 
\ No newline at end of file
@@ -6,6 +6,29 @@ Simple test script to verify ThinkBoard application setup
 import sys
 import os
 
+def upload_test_csv(client, filename, content):
+    """Upload CSV text through /upload and return the JSON response"""
+    import io
+    response = client.post('/upload', data={'file': (io.BytesIO(content if isinstance(content, bytes) else content.encode()), filename)})
+    return response.get_json()
+
+def remove_test_upload(app_module, filename):
+    """Delete an uploaded test file and everything derived from it"""
+    path = os.path.abspath(os.path.join(app_module.upload_folder(), filename))
+    dataset = app_module.dataset_registry.get_by_path(path)
+    if dataset is not None:
+        app_module.invalidate_derived(dataset)
+        app_module.dataset_registry.remove(dataset.dataset_id)
+    app_module.dataframe_cache.invalidate(path)
+    if app_module.columnar_store is not None:
+        app_module.columnar_store.remove(path)
+        lock_path = app_module.columnar_store.sidecar_path(path) + '.lock'
+        if os.path.exists(lock_path):
+            os.remove(lock_path)
+    app_module.get_metadata_catalog().remove(path)
+    if os.path.exists(path):
+        os.remove(path)
+
 def test_imports():
     """Test if all required modules can be imported"""
     try:
@@ -72,6 +95,1181 @@ def test_app_creation():
         print(f"❌ Flask app creation failed: {e}")
         return False
 
+def test_dataframe_cache():
+    """Test that repeat loads are served from the DataFrame cache"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        from cache import DataFrameCache
+        
+        cache = DataFrameCache(64 * 1024 * 1024)
+        path = os.path.join('Uploads', 'sample_data1.csv')
+        first = cache.get(path)
+        second = cache.get(path)
+        if first is not second or cache.hits != 1 or cache.misses != 1:
+            print(f"❌ Expected one miss then one hit, got {cache.stats()}")
+            return False
+        
+        cache.invalidate(path)
+        cache.get(path)
+        if cache.misses != 2:
+            print("❌ Invalidated entry was not re-parsed")
+            return False
+        
+        tiny = DataFrameCache(1)
+        tiny.get(path)
+        if tiny.stats()["entries"] != 0:
+            print("❌ Entry larger than the byte budget was cached")
+            return False
+        
+        print("✅ DataFrame cache hits, misses and eviction work")
+        return True
+    except Exception as e:
+        print(f"❌ DataFrame cache test failed: {e}")
+        return False
+
+def test_dataset_registry():
+    """Test dataset registration, lookup and versioning"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import pandas as pd
+        from datasets import DatasetRegistry
+        
+        registry = DatasetRegistry()
+        path = os.path.join('Uploads', 'sample_data1.csv')
+        df = pd.read_csv(path)
+        dataset = registry.register(path, df)
+        if registry.get(dataset.dataset_id) is not dataset or registry.latest() is not dataset:
+            print("❌ Registered dataset could not be resolved by ID")
+            return False
+        if dataset.columns != df.columns.tolist() or dataset.row_count != len(df):
+            print("❌ Dataset schema was not recorded")
+            return False
+        
+        again = registry.register(path, df)
+        if again.dataset_id != dataset.dataset_id or again.version != 2:
+            print("❌ Re-upload should keep the ID and bump the version")
+            return False
+        
+        print("✅ Dataset registry resolves IDs and tracks versions")
+        return True
+    except Exception as e:
+        print(f"❌ Dataset registry test failed: {e}")
+        return False
+
+def test_columnar_store():
+    """Test that the columnar sidecar round-trips a CSV"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import shutil
+        import tempfile
+        import pandas as pd
+        from columnar import ColumnarStore
+        
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, 'sample.csv')
+            shutil.copy(os.path.join('Uploads', 'sample_data3.csv'), path)
+            df = pd.read_csv(path)
+            
+            store = ColumnarStore()
+            store.write(path, df)
+            if not store.load_frame(path).equals(df):
+                print("❌ Columnar copy does not match the parsed CSV")
+                return False
+            if list(store.load_column(path, 'temperature')) != df['temperature'].tolist():
+                print("❌ Memory-mapped column does not match the parsed CSV")
+                return False
+            
+            with open(path, 'a') as f:
+                f.write("2024-02-01,1,1,1,Sunny\n")
+            if store.load_frame(path) is not None:
+                print("❌ Stale columnar copy was used after the CSV changed")
+                return False
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        
+        print("✅ Columnar store round-trips and detects stale copies")
+        return True
+    except Exception as e:
+        print(f"❌ Columnar store test failed: {e}")
+        return False
+
+def test_restart_resolution():
+    """Test that the newest upload is re-registered with its sniffed CSV options after a restart"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import app as app_module
+        from datasets import DatasetRegistry
+        
+        client = app_module.app.test_client()
+        content = "stadt;wert\n" + "".join(f"M\u00fcnchen {i};{i}\n" for i in range(10))
+        registry = app_module.dataset_registry
+        try:
+            upload_test_csv(client, 'test_restart.csv', content.encode('latin-1'))
+            path = os.path.abspath(os.path.join(app_module.upload_folder(), 'test_restart.csv'))
+            for drop_catalog_record in (False, True):
+                # A fresh process: nothing registered, cached or mapped yet
+                app_module.dataset_registry = DatasetRegistry()
+                app_module.dataframe_cache.invalidate(path)
+                if app_module.columnar_store is not None:
+                    app_module.columnar_store.remove(path)
+                if drop_catalog_record:
+                    app_module.get_metadata_catalog().remove(path)
+                response = client.post('/sort', json={"column": "wert", "order": "desc", "limit": 1})
+                rows = (response.get_json() or {}).get("rows")
+                if response.status_code != 200 or rows != [{"stadt": "M\u00fcnchen 9", "wert": 9}]:
+                    print(f"❌ Re-resolved upload was parsed wrongly: {response.status_code} {response.get_json()}")
+                    return False
+        finally:
+            app_module.dataset_registry = registry
+            remove_test_upload(app_module, 'test_restart.csv')
+        
+        print("✅ Uploads are re-registered with their encoding and delimiter after a restart")
+        return True
+    except Exception as e:
+        print(f"❌ Restart resolution test failed: {e}")
+        return False
+
+def test_streaming_summary():
+    """Test that chunked ingestion matches the in-memory summary"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import pandas as pd
+        from ingest import FrequencySketch, summarize_csv_streaming
+        
+        path = os.path.join('Uploads', 'sample_data2.csv')
+        df = pd.read_csv(path)
+        streamed = summarize_csv_streaming(path, chunk_rows=3)
+        summary = streamed.summary()
+        
+        if streamed.row_count != len(df) or summary["numeric_columns"] != df.select_dtypes(include='number').columns.tolist():
+            print("❌ Streaming summary has the wrong shape")
+            return False
+        for col in summary["numeric_columns"]:
+            expected = (df[col].mean(), df[col].median(), df[col].mode().iloc[0], df[col].min(), df[col].max())
+            actual = (summary["mean_values"][col], summary["median_values"][col], summary["mode_values"][col],
+                      summary["min_values"][col], summary["max_values"][col])
+            if any(abs(a - e) > 1e-9 for a, e in zip(actual, expected)):
+                print(f"❌ Streaming statistics for {col} differ: {actual} != {expected}")
+                return False
+        
+        # With every value distinct the counters cancel out; the mode is the smallest value, like Series.mode()
+        sketch = FrequencySketch(size=4)
+        for start in range(30, 10, -5):
+            sketch.update([float(value) for value in range(start - 5, start)])
+        if sketch.mode() != 10.0:
+            print(f"❌ All-distinct sketch mode should be 10.0, got {sketch.mode()}")
+            return False
+        
+        print("✅ Streaming summary matches the in-memory summary")
+        return True
+    except Exception as e:
+        print(f"❌ Streaming summary test failed: {e}")
+        return False
+
+def test_csv_sniffing():
+    """Test encoding, delimiter and header detection"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import shutil
+        import tempfile
+        from ingest import read_csv_once
+        
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, 'semicolon.csv')
+            with open(path, 'wb') as f:
+                f.write("city;temperature\nZürich;12\nMünchen;15\n".encode('latin-1'))
+            df, options = read_csv_once(path)
+            if options["sep"] != ';' or options["encoding"] != 'latin-1' or df['city'].tolist() != ['Zürich', 'München']:
+                print(f"❌ Semicolon latin-1 file was misread with {options}")
+                return False
+            
+            with open(path, 'w') as f:
+                f.write("1,2\n3,4\n")
+            df, options = read_csv_once(path)
+            if df.columns.tolist() != ['column_1', 'column_2'] or len(df) != 2:
+                print(f"❌ Headerless file was misread with {options}")
+                return False
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        
+        print("✅ CSV encoding, delimiter and header are detected")
+        return True
+    except Exception as e:
+        print(f"❌ CSV sniffing test failed: {e}")
+        return False
+
+def test_vectorized_summary():
+    """Test the vectorized summary against per-column pandas statistics"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import numpy as np
+        from benchmark import make_frame, summarize_per_column
+        from ingest import summarize_frame
+        
+        df = make_frame(5000)
+        df.loc[::7, 'price'] = np.nan
+        expected = summarize_per_column(df)
+        summary = summarize_frame(df)
+        for stat, values in expected.items():
+            for col, value in values.items():
+                if abs(summary[stat][col] - value) > 1e-9:
+                    print(f"❌ {stat} for {col}: {summary[stat][col]} != {value}")
+                    return False
+        
+        approximate = summarize_frame(df, approximate=True, sample_rows=1000)
+        if approximate["min_values"] != summary["min_values"] or approximate["max_values"] != summary["max_values"]:
+            print("❌ Approximate summary should keep exact min and max")
+            return False
+        
+        print("✅ Vectorized summary matches per-column statistics")
+        return True
+    except Exception as e:
+        print(f"❌ Vectorized summary test failed: {e}")
+        return False
+
+def test_top_k_sort():
+    """Test that partial selection returns the same rows as a full sort"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import numpy as np
+        import pandas as pd
+        from queries import sorted_positions
+        
+        values = pd.Series([3, np.nan, 1, 3, 2, 1, np.nan, 5])
+        for ascending in (True, False):
+            expected = values.sort_values(ascending=ascending, kind='stable').index.tolist()
+            for k in range(len(values) + 1):
+                if sorted_positions(values, ascending, k=k).tolist() != expected[:k]:
+                    print(f"❌ Top-{k} ({'asc' if ascending else 'desc'}) does not match a full sort")
+                    return False
+        
+        names = pd.Series(['pear', 'apple', None, 'fig'])
+        if sorted_positions(names, k=2).tolist() != [1, 3]:
+            print("❌ Top-k on a text column is wrong")
+            return False
+        
+        print("✅ Top-k sort matches the full sort")
+        return True
+    except Exception as e:
+        print(f"❌ Top-k sort test failed: {e}")
+        return False
+
+def test_streaming_responses():
+    """Test that streamed rows match the buffered JSON response"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import json
+        import pandas as pd
+        from responses import iter_json_array, iter_ndjson
+        
+        df = pd.read_csv(os.path.join('Uploads', 'sample_data1.csv'))
+        expected = json.loads(df.to_json(orient='records'))
+        if json.loads(''.join(iter_json_array(df, batch_rows=3))) != expected:
+            print("❌ Chunked JSON array does not match the records")
+            return False
+        lines = ''.join(iter_ndjson(df, batch_rows=3)).splitlines()
+        if [json.loads(line) for line in lines] != expected:
+            print("❌ NDJSON stream does not match the records")
+            return False
+        if ''.join(iter_json_array(df, positions=[])) != '[]':
+            print("❌ Empty result should stream as []")
+            return False
+        
+        print("✅ Streaming responses match buffered records")
+        return True
+    except Exception as e:
+        print(f"❌ Streaming response test failed: {e}")
+        return False
+
+def test_streamed_page_headers():
+    """Test that streamed /sort pages and /search results carry their pagination headers"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import json
+        import app as app_module
+        
+        client = app_module.app.test_client()
+        content = "name,score\n" + "".join(f"row{i},{i % 7}\n" for i in range(25))
+        try:
+            dataset_id = upload_test_csv(client, 'test_stream_pages.csv', content)["dataset_id"]
+            response = client.post('/sort', json={"dataset_id": dataset_id, "column": "score", "limit": 10, "stream": "ndjson"})
+            rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+            cursor = response.headers.get('X-Next-Cursor')
+            if len(rows) != 10 or response.headers.get('X-Total-Count') != '25' or not cursor:
+                print(f"❌ Streamed page headers missing: {dict(response.headers)}")
+                return False
+            
+            # Streamed bodies are read before the next request so their contexts unwind in order
+            response = client.post('/sort', json={"cursor": cursor, "stream": "ndjson"})
+            response.get_data()
+            response = client.post('/sort', json={"cursor": response.headers['X-Next-Cursor'], "stream": True})
+            if len(json.loads(response.get_data(as_text=True))) != 5 or 'X-Next-Cursor' in response.headers:
+                print("❌ Last streamed page should have 5 rows and no next cursor")
+                return False
+            
+            response = client.post('/search', json={"dataset_id": dataset_id, "column": "name", "query": "row1", "stream": True})
+            if response.headers.get('X-Total-Count') != str(len(json.loads(response.get_data(as_text=True)))):
+                print("❌ Streamed search does not report its result count")
+                return False
+        finally:
+            remove_test_upload(app_module, 'test_stream_pages.csv')
+        
+        print("✅ Streamed pages carry X-Total-Count and X-Next-Cursor")
+        return True
+    except Exception as e:
+        print(f"❌ Streamed page header test failed: {e}")
+        return False
+
+def test_sort_index():
+    """Test sort permutation building, lookup and invalidation"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import pandas as pd
+        from datasets import DatasetRegistry
+        from indexes import SortIndexCache
+        from queries import sorted_positions
+        
+        path = os.path.join('Uploads', 'sample_data1.csv')
+        df = pd.read_csv(path)
+        dataset = DatasetRegistry().register(path, df)
+        indexes = SortIndexCache(1024 * 1024, build_after=2)
+        
+        if indexes.should_build(dataset, 'score', False) or not indexes.should_build(dataset, 'score', False):
+            print("❌ Index should be built on the second request")
+            return False
+        indexes.build(dataset, 'score', False, sorted_positions(df['score'], False))
+        permutation = indexes.lookup(dataset, 'score', False)
+        expected = df.sort_values('score', ascending=False, kind='stable').index.tolist()
+        if permutation is None or permutation.tolist() != expected:
+            print("❌ Stored permutation does not match the sort order")
+            return False
+        if indexes.stats()["bytes"] != len(df) * 4:
+            print("❌ Index memory is not reported")
+            return False
+        
+        indexes.invalidate(dataset.path)
+        if indexes.lookup(dataset, 'score', False) is not None:
+            print("❌ Index survived invalidation")
+            return False
+        
+        print("✅ Sort indexes build, serve and invalidate")
+        return True
+    except Exception as e:
+        print(f"❌ Sort index test failed: {e}")
+        return False
+
+def test_trigram_index():
+    """Test that trigram search matches the full-column scan"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import numpy as np
+        import pandas as pd
+        from indexes import TrigramIndex
+        
+        series = pd.read_csv(os.path.join('Uploads', 'sample_data3.csv'))['condition']
+        index = TrigramIndex(series)
+        for query in ['Cloud', 'SUNNY', 'rtly cl', 'snowy']:
+            expected = np.flatnonzero(series.astype(str).str.contains(query, case=False, na=False).to_numpy())
+            if index.search(query).tolist() != expected.tolist():
+                print(f"❌ Trigram search for '{query}' differs from the scan")
+                return False
+        
+        # Characters that lower-case to a different length, or that re.IGNORECASE
+        # equates beyond str.lower(), must not be dropped by the trigram filter
+        cities = pd.Series(['İstanbul', 'ISTANBUL', 'ıstanbul', 'Straße', 'STRASSE', 'maſs', 'Mass', None] * 3)
+        index = TrigramIndex(cities)
+        for query in ['istanbul', 'STANBUL', 'ıst', 'mass', 'MAS', 'straße', 'STRASSE']:
+            expected = np.flatnonzero(cities.astype(str).str.contains(query, case=False, na=False).to_numpy())
+            if index.search(query).tolist() != expected.tolist():
+                print(f"❌ Trigram search for '{query}' differs from the scan")
+                return False
+        if TrigramIndex.supports('İst'):
+            print("❌ Queries that change length when lower-cased must fall back to a scan")
+            return False
+        if TrigramIndex.supports('ab') or TrigramIndex.supports('Sun.y'):
+            print("❌ Short and regex queries must fall back to a scan")
+            return False
+        
+        print("✅ Trigram index matches the column scan")
+        return True
+    except Exception as e:
+        print(f"❌ Trigram index test failed: {e}")
+        return False
+
+def test_result_cache():
+    """Test result cache hits, TTL expiry and invalidation"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        from cache import ResultCache
+        from datasets import Dataset
+        
+        dataset = Dataset('abc123', os.path.abspath('data.csv'))
+        cache = ResultCache(1024, ttl=60)
+        key = ResultCache.make_key('sort', dataset, column='price', ascending=True, limit=10, offset=0)
+        if cache.get(key) is not None:
+            print("❌ Empty cache returned a result")
+            return False
+        cache.put(key, b'[]', 'application/json')
+        if cache.get(key).body != b'[]':
+            print("❌ Cached body was not returned")
+            return False
+        
+        dataset.version += 1
+        if cache.get(ResultCache.make_key('sort', dataset, column='price', ascending=True, limit=10, offset=0)) is not None:
+            print("❌ A new dataset version reused an old result")
+            return False
+        
+        cache.ttl = 0
+        if cache.get(key) is not None or cache.stats()["expirations"] != 1:
+            print("❌ Expired result was served")
+            return False
+        
+        cache.ttl = 60
+        cache.put(key, b'[]', 'application/json')
+        cache.invalidate(dataset.path)
+        if cache.get(key) is not None:
+            print("❌ Invalidated result was served")
+            return False
+        
+        print("✅ Result cache works")
+        return True
+    except Exception as e:
+        print(f"❌ Result cache test failed: {e}")
+        return False
+
+def test_downsampling():
+    """Test that downsampling bounds the point count and keeps extremes"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import numpy as np
+        from downsample import downsample
+        
+        values = np.zeros(10_000)
+        values[4321], values[7000] = 50.0, -30.0
+        for method in ['lttb', 'minmax']:
+            positions, sampled = downsample(values, 100, method)
+            if len(sampled) > 100 or np.any(np.diff(positions) <= 0):
+                print(f"❌ {method} returned too many or unordered points")
+                return False
+            if 4321 not in positions or 7000 not in positions:
+                print(f"❌ {method} dropped a peak")
+                return False
+        
+        positions, _ = downsample(values[:50], 100)
+        if len(positions) != 50:
+            print("❌ Short series should be returned unchanged")
+            return False
+        
+        print("✅ Downsampling keeps peaks within max_points")
+        return True
+    except Exception as e:
+        print(f"❌ Downsampling test failed: {e}")
+        return False
+
+def test_metadata_catalog():
+    """Test that the catalog persists schemas and re-profiles changed files"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import shutil
+        import tempfile
+        from catalog import MetadataCatalog
+        
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, 'sample.csv')
+            shutil.copy(os.path.join('Uploads', 'sample_data3.csv'), path)
+            profiled = []
+            def profile(file_path):
+                profiled.append(file_path)
+                with open(file_path) as f:
+                    rows = sum(1 for _ in f) - 1
+                return {"columns": ['a'], "dtypes": {}, "numeric_columns": [], "row_count": rows}, {}
+            
+            db_path = os.path.join(tmp_dir, 'catalog.sqlite3')
+            MetadataCatalog(db_path).reconcile([path], profile)
+            entries = MetadataCatalog(db_path).reconcile([path], profile)
+            if len(profiled) != 1 or entries[0]["row_count"] != 20:
+                print("❌ Unchanged file was profiled again after a restart")
+                return False
+            
+            with open(path, 'a') as f:
+                f.write("\n2024-02-01,1,1,1,Sunny\n")
+            entries = MetadataCatalog(db_path).reconcile([path], profile)
+            if len(profiled) != 2 or entries[0]["row_count"] != 21:
+                print("❌ Changed file was not profiled again")
+                return False
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        
+        print("✅ Metadata catalog persists and reconciles changed files")
+        return True
+    except Exception as e:
+        print(f"❌ Metadata catalog test failed: {e}")
+        return False
+
+def test_job_queue():
+    """Test background jobs report results, failures and back-pressure"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import threading
+        import time
+        from jobs import JobQueue, JobQueueFull
+        
+        release = threading.Event()
+        def work(job, value):
+            job.report('working', 0.5)
+            release.wait(5)
+            if value < 0:
+                return {"error": "negative"}, 400
+            return {"value": value * 2}, 200
+        
+        jobs = JobQueue(workers=1, max_pending=1)
+        ok = jobs.submit('test', work, 21)
+        time.sleep(0.1)
+        failing = jobs.submit('test', work, -1)
+        try:
+            jobs.submit('test', work, 1)
+            print("❌ Full queue accepted another job")
+            return False
+        except JobQueueFull:
+            pass
+        
+        release.set()
+        deadline = time.time() + 5
+        while not (ok.finished and failing.finished) and time.time() < deadline:
+            time.sleep(0.01)
+        if ok.status != 'done' or ok.result != {"value": 42} or jobs.get(ok.job_id) is not ok:
+            print("❌ Finished job did not report its result")
+            return False
+        if failing.status != 'failed' or failing.error != "negative":
+            print("❌ Failed job did not report its error")
+            return False
+        
+        print("✅ Job queue runs jobs and refuses work when full")
+        return True
+    except Exception as e:
+        print(f"❌ Job queue test failed: {e}")
+        return False
+
+def test_async_upload_endpoint():
+    """Test async uploads over HTTP: 202, job polling and the finished result"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import io
+        import time
+        import app as app_module
+        
+        client = app_module.app.test_client()
+        content = "name,score\n" + "".join(f"row{i},{i}\n" for i in range(20))
+        try:
+            response = client.post('/upload?async=1', data={'file': (io.BytesIO(content.encode()), 'test_async.csv')})
+            body = response.get_json()
+            if response.status_code != 202 or response.headers.get('Location') != body["status_url"]:
+                print(f"❌ Async upload was not accepted with a status URL: {response.status_code} {body}")
+                return False
+            
+            deadline = time.time() + 10
+            job = client.get(body["status_url"]).get_json()
+            while job["status"] in ('queued', 'running') and time.time() < deadline:
+                time.sleep(0.05)
+                job = client.get(body["status_url"]).get_json()
+            if job["status"] != 'done' or job["result"]["summary"]["row_count"] != 20:
+                print(f"❌ Upload job did not finish with a summary: {job}")
+                return False
+            if client.get('/jobs/missing').status_code != 404:
+                print("❌ Unknown job did not return 404")
+                return False
+        finally:
+            remove_test_upload(app_module, 'test_async.csv')
+        
+        print("✅ Async uploads return 202 and finish through /jobs")
+        return True
+    except Exception as e:
+        print(f"❌ Async upload endpoint test failed: {e}")
+        return False
+
+def test_streamed_job_progress():
+    """Test that a streamed upload job reports per-chunk progress and every later stage"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import shutil
+        import app as app_module
+        from jobs import Job
+        
+        class RecordingJob(Job):
+            def __init__(self):
+                super().__init__('upload')
+                self.reports = []
+            
+            def report(self, stage, progress=None, **details):
+                super().report(stage, progress, **details)
+                self.reports.append((stage, self.progress, dict(details)))
+        
+        path = os.path.join(app_module.upload_folder(), 'test_streamed_job.csv')
+        shutil.copy(os.path.join('Uploads', 'sample_data2.csv'), path)
+        chunk_rows = app_module.INGEST_CHUNK_ROWS
+        try:
+            app_module.INGEST_CHUNK_ROWS = 3
+            job = RecordingJob()
+            payload, status = app_module.ingest_streaming(path, 'test_streamed_job.csv', job)
+        finally:
+            app_module.INGEST_CHUNK_ROWS = chunk_rows
+            remove_test_upload(app_module, 'test_streamed_job.csv')
+        
+        stages = [stage for stage, _, _ in job.reports]
+        parsing = [details for stage, _, details in job.reports if stage == 'parsing']
+        if status != 200 or stages[-2:] != ['indexing', 'summarizing'] or len(parsing) < 2:
+            print(f"❌ Streamed job did not move through its stages: {stages}")
+            return False
+        if parsing[-1]["rows_processed"] != payload["summary"]["row_count"] or parsing[-1]["bytes_processed"] != os.path.getsize(os.path.join('Uploads', 'sample_data2.csv')):
+            print(f"❌ Last chunk did not report every row and byte: {parsing[-1]}")
+            return False
+        if [progress for _, progress, _ in job.reports] != sorted(progress for _, progress, _ in job.reports):
+            print("❌ Job progress went backwards")
+            return False
+        
+        print("✅ Streamed upload jobs report chunk progress and later stages")
+        return True
+    except Exception as e:
+        print(f"❌ Streamed job progress test failed: {e}")
+        return False
+
+def test_process_offload():
+    """Test that worker processes return the same positions as in-thread work"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import pandas as pd
+        from offload import ProcessOffload, search_positions_task, sort_positions_task
+        from queries import sorted_positions
+        
+        path = os.path.abspath(os.path.join('Uploads', 'sample_data3.csv'))
+        df = pd.read_csv(path)
+        pool = ProcessOffload(1, 64 * 1024 * 1024, use_columnar=False)
+        try:
+            positions = pool.run(sort_positions_task, path, {}, 'humidity', False, 5)
+            if positions.tolist() != sorted_positions(df['humidity'], False, 5).tolist():
+                print("❌ Offloaded sort differs from the in-thread sort")
+                return False
+            positions = pool.run(search_positions_task, path, {}, 'condition', 'sun')
+            if positions.tolist() != df.index[df['condition'].str.contains('sun', case=False)].tolist():
+                print("❌ Offloaded search differs from the in-thread scan")
+                return False
+        finally:
+            pool.shutdown()
+        
+        print("✅ Process pool matches in-thread results")
+        return True
+    except Exception as e:
+        print(f"❌ Process offload test failed: {e}")
+        return False
+
+def test_shared_frames():
+    """Test that datasets are materialized once and shared memory-mapped"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import shutil
+        import tempfile
+        import pandas as pd
+        from cache import frame_nbytes, mapped_nbytes
+        from columnar import ColumnarStore
+        
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, 'sample.csv')
+            shutil.copy(os.path.join('Uploads', 'sample_data3.csv'), path)
+            loads = []
+            def loader():
+                loads.append(path)
+                return pd.read_csv(path)
+            
+            # Two stores stand in for two worker processes
+            first = ColumnarStore().materialize(path, loader)
+            second = ColumnarStore().materialize(path, loader)
+            if len(loads) != 1 or not second.equals(pd.read_csv(path)):
+                print("❌ Dataset was parsed more than once")
+                return False
+            if mapped_nbytes(second) != second['temperature'].nbytes * 3:
+                print("❌ Numeric columns are not memory-mapped")
+                return False
+            if frame_nbytes(first) >= int(first.memory_usage(index=True, deep=True).sum()):
+                print("❌ Mapped columns were counted as private memory")
+                return False
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        
+        print("✅ Frames are materialized once and shared")
+        return True
+    except Exception as e:
+        print(f"❌ Shared frame test failed: {e}")
+        return False
+
+def test_metrics():
+    """Test Prometheus rendering of counters, gauges and histograms"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        from metrics import MetricsRegistry
+        
+        registry = MetricsRegistry(prefix='test')
+        latency = registry.histogram('latency_seconds', 'Latency', ['route'], buckets=(0.1, 1.0))
+        hits = registry.counter('hits_total', 'Hits', ['route'])
+        registry.collector(lambda: [("ratio", "gauge", "Ratio", [({"cache": 'a"b'}, 0.5)])])
+        for value in [0.05, 0.1, 0.5, 3.0]:
+            latency.observe(value, route='/sort')
+        hits.inc(route='/sort')
+        hits.inc(2, route='/sort')
+        
+        text = registry.render()
+        expected = [
+            '# TYPE test_latency_seconds histogram',
+            'test_latency_seconds_bucket{route="/sort",le="0.1"} 2',
+            'test_latency_seconds_bucket{route="/sort",le="1"} 3',
+            'test_latency_seconds_bucket{route="/sort",le="+Inf"} 4',
+            'test_latency_seconds_count{route="/sort"} 4',
+            'test_hits_total{route="/sort"} 3',
+            'test_ratio{cache="a\\"b"} 0.5'
+        ]
+        missing = [line for line in expected if line not in text.splitlines()]
+        if missing:
+            print(f"❌ Missing metric lines: {missing}")
+            return False
+        
+        print("✅ Metrics render in the Prometheus text format")
+        return True
+    except Exception as e:
+        print(f"❌ Metrics test failed: {e}")
+        return False
+
+def test_metrics_endpoint():
+    """Test that /metrics counts requests per route template over HTTP"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import app as app_module
+        
+        client = app_module.app.test_client()
+        
+        def count(line_prefix):
+            for line in client.get('/metrics').get_data(as_text=True).splitlines():
+                if line.startswith(line_prefix + ' '):
+                    return float(line.rsplit(' ', 1)[1])
+            return 0.0
+        
+        health = 'thinkboard_requests_total{route="/health",method="GET",status="200"}'
+        jobs = 'thinkboard_requests_total{route="/jobs/<job_id>",method="GET",status="404"}'
+        before = count(health), count(jobs)
+        client.get('/health')
+        client.get('/health')
+        client.get('/jobs/first-missing')
+        client.get('/jobs/second-missing')
+        if (count(health), count(jobs)) != (before[0] + 2, before[1] + 2):
+            print("❌ Requests were not counted under their route template")
+            return False
+        response = client.get('/metrics')
+        if not response.content_type.startswith('text/plain') or '# TYPE thinkboard_request_duration_seconds histogram' not in response.get_data(as_text=True):
+            print("❌ /metrics is not in the Prometheus text format")
+            return False
+        
+        print("✅ /metrics counts requests by route template")
+        return True
+    except Exception as e:
+        print(f"❌ Metrics endpoint test failed: {e}")
+        return False
+
+def test_profiling():
+    """Test per-request stage timings and the Server-Timing header value"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        from profiling import begin_profile, current_profile, end_profile, stage
+        
+        with stage('outside'):
+            pass
+        if current_profile() is not None:
+            print("❌ Stages were recorded without an active profile")
+            return False
+        
+        profile = begin_profile(cprofile=True)
+        with stage('parse'):
+            sum(range(10000))
+        with stage('parse'):
+            pass
+        with stage('serialize'):
+            pass
+        if end_profile() is not profile or current_profile() is not None:
+            print("❌ Profile was not ended")
+            return False
+        
+        header = profile.server_timing()
+        names = [part.split(';')[0] for part in header.split(', ')]
+        if names != ['parse', 'serialize', 'total'] or profile.duration < profile.stages['parse']:
+            print(f"❌ Unexpected Server-Timing value: {header}")
+            return False
+        top = profile.top(5)
+        if top is not None and 'cumulative' not in top:
+            print("❌ cProfile output is not sorted by cumulative time")
+            return False
+        
+        print("✅ Stage timings accumulate into a Server-Timing header")
+        return True
+    except Exception as e:
+        print(f"❌ Profiling test failed: {e}")
+        return False
+
+def test_benchmark_baseline():
+    """Test that endpoint regressions are flagged against a saved baseline"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        from benchmark import compare_to_baseline
+        
+        baseline = {"endpoints": [
+            {"endpoint": "sort", "rows": 1000, "median_s": 0.100},
+            {"endpoint": "search", "rows": 1000, "median_s": 0.100},
+            {"endpoint": "stats", "rows": 1000, "median_s": 0.0005}
+        ]}
+        results = [
+            {"endpoint": "sort", "rows": 1000, "median_s": 0.150},
+            {"endpoint": "search", "rows": 1000, "median_s": 0.110},
+            {"endpoint": "stats", "rows": 1000, "median_s": 0.0015},
+            {"endpoint": "gradient", "rows": 1000, "median_s": 1.0}
+        ]
+        regressions = compare_to_baseline(results, baseline, tolerance=0.25)
+        if [(row["endpoint"], round(row["slowdown"], 2)) for row in regressions] != [("sort", 1.5)]:
+            print(f"❌ Unexpected regressions: {regressions}")
+            return False
+        
+        print("✅ Only slowdowns past the tolerance and noise floor are flagged")
+        return True
+    except Exception as e:
+        print(f"❌ Benchmark baseline test failed: {e}")
+        return False
+
+def test_lazy_imports():
+    """Test that importing the app defers pandas, NumPy and folder setup"""
+    try:
+        import subprocess
+        sys.path.insert(0, os.getcwd())
+        from lazy import LazyModule, lazy_import
+        
+        module = lazy_import('colorsys')
+        if 'colorsys' not in sys.modules and not isinstance(module, LazyModule):
+            print("❌ Expected a LazyModule for a module that is not imported yet")
+            return False
+        if module.rgb_to_hsv(1.0, 0.0, 0.0) != (0.0, 1.0, 1.0) or 'colorsys' not in sys.modules:
+            print("❌ LazyModule did not import the real module on first use")
+            return False
+        
+        probe = "import sys, app; print('pandas' in sys.modules, 'numpy' in sys.modules, app.upload_folder_ready)"
+        output = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True).stdout
+        if output.split() != ['False', 'False', 'False']:
+            print(f"❌ Importing app did eager work (pandas, numpy, upload folder): {output.strip()}")
+            return False
+        
+        print("✅ pandas, NumPy and the upload folder are set up on first use")
+        return True
+    except Exception as e:
+        print(f"❌ Lazy import test failed: {e}")
+        return False
+
+def test_compression():
+    """Test response compression and the compressed copies kept by the result cache"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        from cache import ResultCache
+        from compression import available_encodings, compress, decompress, etag_for
+        
+        body = b'{"rows": [' + b','.join(b'{"product": "Laptop", "price": 1200}' for _ in range(500)) + b']}'
+        for encoding in available_encodings():
+            data = compress(body, encoding)
+            if decompress(data, encoding) != body or len(data) >= len(body) // 5:
+                print(f"❌ {encoding} did not round-trip or barely compressed ({len(data)} bytes)")
+                return False
+        if compress(body, 'gzip') != compress(body, 'gzip'):
+            print("❌ gzip output is not deterministic")
+            return False
+        
+        if etag_for('a.csv', 1, 'sort') != etag_for('a.csv', 1, 'sort') or etag_for('a.csv', 1, 'sort') == etag_for('a.csv', 2, 'sort'):
+            print("❌ ETags must be stable for the same inputs and differ otherwise")
+            return False
+        
+        cache = ResultCache(1024 * 1024, ttl=60)
+        entry = cache.put('key', body, 'application/json')
+        gzipped = compress(body, 'gzip')
+        cache.add_encoding('key', entry, 'gzip', gzipped)
+        if cache.get('key').encoded.get('gzip') != gzipped or cache.stats()["bytes"] != len(body) + len(gzipped):
+            print(f"❌ Compressed copy not kept or not counted: {cache.stats()}")
+            return False
+        
+        print("✅ Bodies compress deterministically and compressed copies are cached")
+        return True
+    except Exception as e:
+        print(f"❌ Compression test failed: {e}")
+        return False
+
+def test_response_formats():
+    """Test column-oriented JSON and Accept negotiation of response formats"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import numpy as np
+        import pandas as pd
+        from flask import Flask
+        from responses import available_formats, frame_columns, response_format, rows_response
+        
+        df = pd.DataFrame({"name": ["a", None, "c"], "score": [1.5, np.nan, 3.0], "rank": [1, 2, 3]})
+        table = frame_columns(df)
+        if table != {"columns": ["name", "score", "rank"], "values": [["a", None, "c"], [1.5, None, 3.0], [1, 2, 3]]}:
+            print(f"❌ Unexpected column-oriented form: {table}")
+            return False
+        
+        app = Flask(__name__)
+        cases = [({}, {}, 'records'), ({'Accept': '*/*'}, {}, 'records'),
+                 ({'Accept': 'application/vnd.thinkboard.columns+json'}, {}, 'columns'),
+                 ({'Accept': 'application/json'}, {'format': 'columns'}, 'columns')]
+        for headers, data, expected in cases:
+            with app.test_request_context(headers=headers):
+                from flask import request
+                if response_format(request, data) != expected:
+                    print(f"❌ {headers} {data} did not negotiate {expected}")
+                    return False
+        with app.test_request_context():
+            from flask import request
+            try:
+                response_format(request, {'format': 'xml'})
+                print("❌ Unknown format was accepted")
+                return False
+            except ValueError:
+                pass
+            for fmt in available_formats():
+                response = rows_response(df, fmt, {"total": 3})
+                if response.status_code != 200 or not response.get_data():
+                    print(f"❌ {fmt} response is empty")
+                    return False
+        
+        print(f"✅ Results serialize as {', '.join(available_formats())}")
+        return True
+    except Exception as e:
+        print(f"❌ Response format test failed: {e}")
+        return False
+
+def test_dtype_optimization():
+    """Test that ingest narrows dtypes without changing values"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import numpy as np
+        import pandas as pd
+        from ingest import optimize_dtypes
+        from queries import contains_positions
+        
+        n = 1000
+        df = pd.DataFrame({
+            "id": np.arange(n),
+            "half": np.arange(n) / 2,
+            "ratio": np.arange(n) / 3,
+            "grade": ["A", "B", "AB", None] * (n // 4),
+            "bucket": [f"bucket{i % 100}" for i in range(n)],
+            "name": [f"row{i}" for i in range(n)]
+        })
+        optimized, report = optimize_dtypes(df)
+        expected = {"id": "int16", "half": "float32", "grade": "category"}
+        if {col: change["to"] for col, change in report["converted"].items()} != expected:
+            print(f"❌ Unexpected conversions: {report['converted']}")
+            return False
+        if report["bytes_after"] >= report["bytes_before"]:
+            print(f"❌ Optimized frame is not smaller: {report}")
+            return False
+        for col in df.columns:
+            if not df[col].equals(optimized[col].astype(df[col].dtype)):
+                print(f"❌ Values of '{col}' changed")
+                return False
+        
+        for source in (df["grade"], df["grade"].astype(object)):
+            categorical = source.astype('category')
+            for query in ("b", "nan", "a"):
+                expected = np.flatnonzero(source.astype(str).str.contains(query, case=False, na=False).to_numpy())
+                if not np.array_equal(contains_positions(categorical, query), expected):
+                    print(f"❌ Categorical search for '{query}' differs from a {source.dtype} string scan")
+                    return False
+        
+        print(f"✅ Dtype optimization saved {report['saved_ratio']:.0%} with identical values")
+        return True
+    except Exception as e:
+        print(f"❌ Dtype optimization test failed: {e}")
+        return False
+
+def test_aggregation():
+    """Test group-by aggregation against per-group pandas results"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import numpy as np
+        import pandas as pd
+        from queries import aggregate_frame, parse_aggregations
+        
+        df = pd.DataFrame({
+            "product": ["Laptop", "Mouse", None, "Laptop", "Mouse", "Laptop"],
+            "sales": np.array([100, 20, 5, 300, 40, 200], dtype=np.int16),
+            "price": np.array([1.5, 2.5, 3.0, 4.5, np.nan, 6.0], dtype=np.float32)
+        })
+        aggregations = parse_aggregations({"sales": ["sum", "mean"], "price": "max"})
+        result = aggregate_frame(df, ["product"], aggregations)
+        if result.columns.tolist() != ["product", "count", "sales_sum", "sales_mean", "price_max"]:
+            print(f"❌ Unexpected result columns: {result.columns.tolist()}")
+            return False
+        if result["product"].tolist()[:2] != ["Laptop", "Mouse"] or not pd.isna(result["product"].iloc[2]):
+            print("❌ Groups are not ordered by key with missing keys last")
+            return False
+        laptop = result.iloc[0]
+        if laptop["count"] != 3 or laptop["sales_sum"] != 600 or laptop["sales_mean"] != 200 or laptop["price_max"] != 6.0:
+            print(f"❌ Wrong aggregates for Laptop: {laptop.to_dict()}")
+            return False
+        
+        # Ingest stores low-cardinality text as unordered categoricals
+        df["store"] = pd.Series(["North", "South", "North", "South", "East", "North"], dtype="category")
+        result = aggregate_frame(df, ["product"], parse_aggregations({"store": ["min", "max", "nunique"]}))
+        if result[["store_min", "store_max", "store_nunique"]].iloc[:2].values.tolist() != [["North", "South", 2], ["East", "South", 2]]:
+            print(f"❌ Wrong min/max of a categorical text column: {result.to_dict('records')}")
+            return False
+        
+        for spec in ({"sales": "avg"}, ["sales"], {"sales": 3}):
+            try:
+                parse_aggregations(spec)
+                print(f"❌ Invalid aggregations {spec} were accepted")
+                return False
+            except ValueError:
+                pass
+        
+        print("✅ Group-by aggregation returns one row per group")
+        return True
+    except Exception as e:
+        print(f"❌ Aggregation test failed: {e}")
+        return False
+
+def test_aggregate_endpoint():
+    """Test /aggregate over HTTP: ordering, paging, caching and validation"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import app as app_module
+        
+        client = app_module.app.test_client()
+        content = "product,store,sales\n" + "".join(f"{['Laptop', 'Mouse', 'Desk'][i % 3]},{['North', 'South'][i % 2]},{i % 30}\n"
+                                                   for i in range(90))
+        try:
+            dataset_id = upload_test_csv(client, 'test_aggregate.csv', content)["dataset_id"]
+            query = {"dataset_id": dataset_id, "group_by": "product", "aggregations": {"sales": "sum"},
+                     "order_by": "sales_sum", "order": "desc", "limit": 2}
+            response = client.post('/aggregate', json=query)
+            body = response.get_json()
+            if response.status_code != 200 or body["groups"] != 3 or body["row_count"] != 90:
+                print(f"❌ Unexpected aggregate response: {response.status_code} {body}")
+                return False
+            if [(row["product"], row["sales_sum"]) for row in body["rows"]] != [("Desk", 465), ("Mouse", 435)]:
+                print(f"❌ Groups were not ordered and paged: {body['rows']}")
+                return False
+            
+            again = client.post('/aggregate', json=query)
+            if again.headers.get('X-Cache') != 'HIT' or again.get_json() != body:
+                print("❌ Repeat aggregation was not served from the result cache")
+                return False
+            # Low-cardinality text is stored as a categorical, min and max still apply to it
+            extremes = client.post('/aggregate', json={"dataset_id": dataset_id, "group_by": "store",
+                                                       "aggregations": {"product": ["min", "max"]}})
+            if extremes.status_code != 200 or [(row["product_min"], row["product_max"]) for row in extremes.get_json()["rows"]] != [("Desk", "Mouse")] * 2:
+                print(f"❌ min/max of a categorized text column failed: {extremes.status_code} {extremes.get_json()}")
+                return False
+            
+            etag = response.headers.get('ETag')
+            if not etag or client.post('/aggregate', json=query, headers={'If-None-Match': etag}).status_code != 304:
+                print("❌ Unchanged aggregation was not answered with 304")
+                return False
+            
+            for invalid in ({"group_by": "missing"}, {"group_by": "product", "aggregations": {"product": "sum"}},
+                            {"group_by": "product", "aggregations": {"sales": "avg"}}, {"group_by": 3}):
+                if client.post('/aggregate', json={"dataset_id": dataset_id, **invalid}).status_code != 400:
+                    print(f"❌ Invalid aggregation {invalid} was not rejected")
+                    return False
+        finally:
+            remove_test_upload(app_module, 'test_aggregate.csv')
+        
+        print("✅ /aggregate orders, pages, caches and validates over HTTP")
+        return True
+    except Exception as e:
+        print(f"❌ Aggregate endpoint test failed: {e}")
+        return False
+
+def test_histograms():
+    """Test multi-resolution histograms from uploads and streamed chunks"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import numpy as np
+        import pandas as pd
+        from ingest import StreamingSummary, summarize_frame
+        
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({"value": rng.normal(size=3000), "flat": 3.0, "label": "x"})
+        df.loc[0, "value"] = np.nan
+        histograms = summarize_frame(df, histogram_resolutions=(8, 16, 32))["histograms"]
+        if list(histograms) != ["value", "flat"]:
+            print(f"❌ Unexpected histogram columns: {list(histograms)}")
+            return False
+        histogram = histograms["value"]
+        expected, _ = np.histogram(df["value"].dropna(), bins=32, range=(histogram["low"], histogram["high"]))
+        if histogram["counts"][32] != expected.tolist():
+            print("❌ Finest histogram differs from np.histogram")
+            return False
+        if histogram["counts"][8] != expected.reshape(8, 4).sum(axis=1).tolist():
+            print("❌ Coarse histogram is not the sum of the finest bins")
+            return False
+        if sum(histograms["flat"]["counts"][8]) != len(df):
+            print("❌ Constant column was not binned")
+            return False
+        
+        streamed = StreamingSummary()
+        for start in range(0, len(df), 1000):
+            streamed.update(df.iloc[start:start + 1000])
+        if streamed.histograms((8, 16, 32))["value"]["counts"][32] != expected.tolist():
+            print("❌ Streamed histogram differs while the sketch is exact")
+            return False
+        
+        print("✅ Histograms are built at every resolution in one pass")
+        return True
+    except Exception as e:
+        print(f"❌ Histogram test failed: {e}")
+        return False
+
+def test_histogram_endpoint():
+    """Test /histogram over HTTP: bin edges, counts and validation"""
+    try:
+        sys.path.insert(0, os.getcwd())
+        import app as app_module
+        
+        client = app_module.app.test_client()
+        content = "label,value\n" + "".join(f"row{i},{i}\n" for i in range(32))
+        try:
+            dataset_id = upload_test_csv(client, 'test_histogram.csv', content)["dataset_id"]
+            response = client.post('/histogram', json={"dataset_id": dataset_id, "column": "value", "bins": 8})
+            body = response.get_json()
+            if response.status_code != 200 or body["bins"] != 8 or body["row_count"] != 32:
+                print(f"❌ Unexpected histogram response: {response.status_code} {body}")
+                return False
+            histogram = body["histograms"]["value"]
+            if histogram["counts"] != [4] * 8 or histogram["edges"][0] != 0 or histogram["edges"][-1] != 31 or len(histogram["edges"]) != 9:
+                print(f"❌ Wrong histogram for 0..31: {histogram}")
+                return False
+            if list(client.post('/histogram', json={"dataset_id": dataset_id}).get_json()["histograms"]) != ["value"]:
+                print("❌ Without a column every numeric column should be returned")
+                return False
+            
+            for invalid in ({"bins": 8.0}, {"bins": True}, {"bins": "8"}, {"bins": 7}, {"column": "label"}, {"column": "missing"}):
+                if client.post('/histogram', json={"dataset_id": dataset_id, **invalid}).status_code != 400:
+                    print(f"❌ Invalid histogram request {invalid} was not rejected")
+                    return False
+        finally:
+            remove_test_upload(app_module, 'test_histogram.csv')
+        
+        print("✅ /histogram serves precomputed bins and validates over HTTP")
+        return True
+    except Exception as e:
+        print(f"❌ Histogram endpoint test failed: {e}")
+        return False
+
 def main():
     """Run all tests"""
     print("🧪 Testing ThinkBoard Application Setup")
@@ -80,7 +1278,39 @@ def main():
     tests = [
         ("Import Tests", test_imports),
         ("File Structure Tests", test_file_structure),
-        ("App Creation Tests", test_app_creation)
+        ("App Creation Tests", test_app_creation),
+        ("DataFrame Cache Tests", test_dataframe_cache),
+        ("Dataset Registry Tests", test_dataset_registry),
+        ("Columnar Store Tests", test_columnar_store),
+        ("Restart Resolution Tests", test_restart_resolution),
+        ("Streaming Summary Tests", test_streaming_summary),
+        ("CSV Sniffing Tests", test_csv_sniffing),
+        ("Vectorized Summary Tests", test_vectorized_summary),
+        ("Top-k Sort Tests", test_top_k_sort),
+        ("Streaming Response Tests", test_streaming_responses),
+        ("Streamed Page Header Tests", test_streamed_page_headers),
+        ("Sort Index Tests", test_sort_index),
+        ("Trigram Index Tests", test_trigram_index),
+        ("Result Cache Tests", test_result_cache),
+        ("Downsampling Tests", test_downsampling),
+        ("Metadata Catalog Tests", test_metadata_catalog),
+        ("Job Queue Tests", test_job_queue),
+        ("Async Upload Endpoint Tests", test_async_upload_endpoint),
+        ("Streamed Job Progress Tests", test_streamed_job_progress),
+        ("Process Offload Tests", test_process_offload),
+        ("Shared Frame Tests", test_shared_frames),
+        ("Metrics Tests", test_metrics),
+        ("Metrics Endpoint Tests", test_metrics_endpoint),
+        ("Profiling Tests", test_profiling),
+        ("Benchmark Baseline Tests", test_benchmark_baseline),
+        ("Lazy Import Tests", test_lazy_imports),
+        ("Compression Tests", test_compression),
+        ("Response Format Tests", test_response_formats),
+        ("Dtype Optimization Tests", test_dtype_optimization),
+        ("Aggregation Tests", test_aggregation),
+        ("Aggregate Endpoint Tests", test_aggregate_endpoint),
+        ("Histogram Tests", test_histograms),
+        ("Histogram Endpoint Tests", test_histogram_endpoint)
     ]
     
     passed = 0
@@ -9,8 +9,10 @@ import sys
 # Add the current directory to Python path
 sys.path.insert(0, os.path.dirname(__file__))
 
-# Import the Flask app
-from app import app
+# Build the Flask app; heavy imports and folder setup are deferred to first use
+from app import create_app
+
+app = create_app()
 
 if __name__ == "__main__":
     # Railway deployment configuration